@@ -0,0 +1,83 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Groups rows by the values of key columns and computes count, sum, mean, median and percentiles of a
+    value column for every group, going over the rows only once
+"""
+import itertools
+import math
+from collections import Counter
+
+
+# Metrics group_by can compute.  p90 and p95 are the 90th and 95th percentiles.
+METRICS = ["count", "sum", "mean", "median", "p90", "p95"]
+
+# Metrics that need every value of a group instead of only its count and sum
+_ORDER_METRICS = {"median": 50, "p90": 90, "p95": 95}
+
+
+# Percentile of sorted values, interpolating between the two closest values
+def percentile(sorted_values, percent):
+    if len(sorted_values) == 0:
+        return 0
+    position = (len(sorted_values) - 1) * percent / 100
+    low = math.floor(position)
+    high = math.ceil(position)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+# Groups the rows by their values in the key columns and computes metrics of the value column for every group.
+# Returns {metric: {group: value}}, where a group is the tuple of key values of its rows, ex.
+#   group_by([subreddit, relevant], score, ["mean"]) -> {"mean": {(0, 1): 2051.4, (0, 0): 0, ...}}
+# Groups without rows are left out.  The groups are counted by a Counter, which loops in C, so the only loop over the
+# rows in Python adds every value to the list of its group, and sums are taken of the lists.
+#   keys: list of columns, every column has a value for every row
+#   values: column to compute the metrics of, only needed for metrics other than count
+#   where: boolean mask of the rows to use, every row if None
+
+def group_by(keys, values=None, metrics=("count",), where=None):
+    for metric in metrics:
+        if metric not in METRICS:
+            raise ValueError("Unknown metric " + metric + ", expected one of " + ", ".join(METRICS))
+    if values is None and any(metric != "count" for metric in metrics):
+        raise ValueError("A value column is needed for metrics other than count")
+
+    groups = zip(*keys)
+    if where is not None:
+        groups = itertools.compress(groups, where)
+    counts = dict(Counter(groups))
+
+    group_values = {group: list() for group in counts}
+    if values is not None:
+        rows = zip(zip(*keys), values)
+        if where is not None:
+            rows = itertools.compress(rows, where)
+        for group, value in rows:
+            group_values[group].append(value)
+    sums = {group: sum(group_list) for group, group_list in group_values.items()}
+
+    result = dict()
+    for metric in metrics:
+        if metric == "count":
+            result[metric] = counts
+        elif metric == "sum":
+            result[metric] = sums
+        elif metric == "mean":
+            result[metric] = {group: sums[group] / counts[group] for group in counts}
+        else:
+            result[metric] = dict()
+
+    if any(metric in _ORDER_METRICS for metric in metrics):
+        for group, group_list in group_values.items():
+            group_list.sort()
+            for metric, percent in _ORDER_METRICS.items():
+                if metric in result:
+                    result[metric][group] = percentile(group_list, percent)
+
+    return result
+
+
+# Lists the values of groups in the given order, with default for groups that had no rows.  Used to line up the
+# result of group_by with the labels of a chart.
+
+def series(groups, order, default=0):
+    return [groups.get(group, default) for group in order]
@@ -0,0 +1,74 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Times finding the links in very long post contents with extract_links against the old search, which
+copied the rest of the content after every link it found.
+Run from the top folder of the project: python benchmarks/bench_links.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from links import extract_links, extract_links_bulk  # noqa: E402
+
+
+# The search list_post_sources used before extract_links, kept here to compare against
+def old_list_sources(content):
+    sources = []
+    end_index = -1
+    if '](http' in content:
+        while end_index != len(content):
+            start_index = int(content.find('](http')) + 2
+            end_index = start_index + int(content[start_index:].find(')'))
+            if end_index == 0:
+                break
+            sources.append(content[start_index:end_index])
+            content = content[end_index + 1:]
+    return sources
+
+
+# Makes post content of about size characters with a markdown link every link_every characters
+def make_content(size, link_every, seed=529):
+    generator = random.Random(seed)
+    words = ["covid", "the", "study", "vaccine", "results", "of", "a", "new", "report", "cases", "and", "science"]
+    parts = list()
+    length = 0
+    next_link = link_every
+    while length < size:
+        if length >= next_link:
+            part = "[source](https://example{n}.org/article/{n}) ".format(n=generator.randint(0, 10 ** 6))
+            next_link += link_every
+        else:
+            part = generator.choice(words) + " "
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def time_call(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print("{:>10} {:>8} {:>12} {:>12} {:>8}".format("chars", "links", "old (s)", "new (s)", "speedup"))
+    for size in [100_000, 1_000_000, 4_000_000]:
+        content = make_content(size, link_every=500)
+        old_time, old_links = time_call(old_list_sources, content)
+        new_time, new_links = time_call(extract_links, content)
+        print("{:>10} {:>8} {:>12.4f} {:>12.4f} {:>7.1f}x".format(
+            len(content), len(new_links), old_time, new_time, old_time / max(new_time, 1e-9)))
+
+    # A whole file's worth of posts, most of them without links
+    contents = [make_content(2_000, link_every=5_000 if i % 10 else 500, seed=i) for i in range(5_000)]
+    old_time, _ = time_call(lambda: [old_list_sources(content) for content in contents])
+    bulk_time, _ = time_call(extract_links_bulk, contents)
+    print("\n{} posts of {} chars: old {:.4f} s, extract_links_bulk {:.4f} s".format(
+        len(contents), sum(len(content) for content in contents), old_time, bulk_time))
+
+
+if __name__ == "__main__":
+    main()
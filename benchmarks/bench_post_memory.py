@@ -0,0 +1,76 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Measures the memory of holding many posts as the old Post objects, which kept a __dict__ and the raw
+strings of the .tsv, against the slotted Post with ints, a timestamp and a tuple of sources.
+Run from the top folder of the project: python benchmarks/bench_post_memory.py [number of posts]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from enrich import list_post_sources  # noqa: E402
+from make_dataset import make_post  # noqa: E402
+from post_table import Post, parse_created, parse_sources  # noqa: E402
+
+
+# The Post parse_data made before it was slotted, kept here to compare against
+class OldPost:
+
+    def __init__(self):
+        self.id = None
+        self.title = ""
+        self.score = 0
+        self.num_comm = 0
+        self.created = ""
+        self.content = ""
+        self.relevant = False
+        self.sources = list()
+
+
+def old_post(row):
+    post = OldPost()
+    post.title = row[0]
+    post.score = row[1]
+    post.num_comm = row[2]
+    post.created = row[3]
+    post.content = row[4]
+    post.relevant = "covid" in row[0].lower()
+    if row[5] != "None":
+        post.sources = row[5][1:len(row[5]) - 1].split(",")
+    return post
+
+
+def new_post(row):
+    return Post(None, row[0], int(row[1]), int(row[2]), parse_created(row[3]), row[4], "covid" in row[0].lower(),
+                parse_sources(row[5]))
+
+
+# Bytes allocated while making a post of every row.  The rows are made first, so only the posts and what they keep
+# from the rows are counted.
+def measure(make, rows):
+    tracemalloc.start()
+    posts = [make(row) for row in rows]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del posts
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = list()
+    for number in range(count):
+        row = make_post("news", number)
+        rows.append([str(value) for value in list_post_sources(row[:5])])
+
+    old_size = measure(old_post, rows)
+    new_size = measure(new_post, rows)
+    print("{} posts: old Post {:.1f} MB ({:.0f} bytes each), slotted Post {:.1f} MB ({:.0f} bytes each), "
+          "{:.1f}x less".format(count, old_size / 1e6, old_size / count, new_size / 1e6, new_size / count,
+                                old_size / max(new_size, 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Makes up a dataset of any size with the same original/ and updated/ .tsv files as data/, to measure how
+the project scales.  The same arguments always make the same files.
+Run from the top folder of the project, ex.
+    python benchmarks/make_dataset.py --posts 1000000 --out /tmp/reddit_1m
+    REDDIT_DATA_DIR=/tmp/reddit_1m python graph_data.py --summary engagement --output /tmp/engagement.html
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from enrich import enrich_rows, updated_columns  # noqa: E402
+from post_table import format_created  # noqa: E402
+from scraper import COLUMNS  # noqa: E402
+
+SUBREDDITS = ["coronavirus", "news", "science", "worldnews"]
+TIME_PERIODS = ["all", "day", "month", "week"]
+
+WORDS = ["the", "study", "new", "report", "cases", "city", "election", "science", "results", "of", "a", "and",
+         "vaccine", "police", "court", "school", "climate", "market", "research", "people"]
+COVID_WORDS = ["covid", "coronavirus", "pandemic", "sars-cov-2", "COVID-19"]
+
+# Rows written at a time, so any number of posts fits in memory
+CHUNK_ROWS = 10_000
+
+# Posts are made in 2020 like the real data
+START_TIME = 1577836800
+
+
+# Makes up post number of a subreddit as a row of the original .tsv files.  The same number always makes the same post,
+# so a post can be in more than one time filter like on Reddit.
+#   selftext_length: about how many characters a post with text has
+#   link_density: links for every 1000 characters of text
+#   text_rate: share of posts that have text, the rest are links or images with no text
+#   covid_rate: share of posts with a COVID keyword in the title
+
+def make_post(subreddit, number, selftext_length=400, link_density=1.0, text_rate=0.5, covid_rate=0.3, seed=529):
+    generator = random.Random("{}:{}:{}".format(seed, subreddit, number))
+
+    words = [generator.choice(WORDS) for _ in range(generator.randint(5, 15))]
+    if generator.random() < covid_rate:
+        words[generator.randrange(len(words))] = generator.choice(COVID_WORDS)
+    title = " ".join(words).capitalize()
+
+    content = ""
+    if generator.random() < text_rate:
+        parts = list()
+        length = 0
+        target = generator.randint(selftext_length // 2, selftext_length * 3 // 2)
+        while length < target:
+            if generator.random() * 1000 < link_density * 8:  # About 8 characters a word
+                part = "[source](https://example{}.org/{}/{})".format(generator.randint(0, 999), subreddit, number)
+            else:
+                part = generator.choice(WORDS)
+            parts.append(part)
+            length += len(part) + 1
+        content = " ".join(parts)
+
+    post_id = "{}{:07x}".format(subreddit[:2], number)
+    return [title, str(generator.randint(1, 200000)), str(generator.randint(0, 20000)),
+            format_created(START_TIME + generator.randrange(366 * 24 * 3600)), content, post_id, "t3_" + post_id]
+
+
+# Writes the original and updated .tsv of every subreddit and time period to <out_dir>/original and
+# <out_dir>/updated, about posts rows in all.  Consecutive time periods share overlap of their posts.  Returns the
+# number of rows written.
+
+def make_dataset(out_dir, posts=10_000, subreddits=SUBREDDITS, overlap=0.3, seed=529, **post_options):
+    os.makedirs(os.path.join(out_dir, "original"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "updated"), exist_ok=True)
+    posts_per_file = max(1, posts // (len(subreddits) * len(TIME_PERIODS)))
+    id_index = COLUMNS.index("id")
+    rows_written = 0
+
+    for subreddit in subreddits:
+        for i, time_period in enumerate(TIME_PERIODS):
+            name = subreddit + "_" + time_period + ".tsv"
+            first = int(i * posts_per_file * (1 - overlap))
+
+            with open(os.path.join(out_dir, "original", name), "w", encoding="utf-8") as original, \
+                    open(os.path.join(out_dir, "updated", name), "w", encoding="utf-8") as updated:
+                original_writer = csv.writer(original, delimiter="\t")
+                original_writer.writerow(COLUMNS)
+                csv.writer(updated, delimiter="\t").writerow(updated_columns(COLUMNS))
+
+                for start in range(first, first + posts_per_file, CHUNK_ROWS):
+                    end = min(start + CHUNK_ROWS, first + posts_per_file)
+                    rows = [make_post(subreddit, number, seed=seed, **post_options) for number in range(start, end)]
+                    original_writer.writerows(rows)
+                    updated.write(enrich_rows(rows, id_index))
+                    rows_written += len(rows)
+
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Makes up a Reddit dataset with the same .tsv files as data/")
+    parser.add_argument("--out", required=True, help="folder to write original/ and updated/ to")
+    parser.add_argument("--posts", type=int, default=10_000, help="rows in all files together")
+    parser.add_argument("--subreddits", type=int, default=len(SUBREDDITS),
+                        help="number of subreddits, more than 4 are named subreddit4, subreddit5, ...")
+    parser.add_argument("--selftext-length", type=int, default=400)
+    parser.add_argument("--link-density", type=float, default=1.0, help="links for every 1000 characters of text")
+    parser.add_argument("--text-rate", type=float, default=0.5, help="share of posts that have text")
+    parser.add_argument("--covid-rate", type=float, default=0.3, help="share of posts with a COVID keyword")
+    parser.add_argument("--overlap", type=float, default=0.3, help="share of posts in the next time filter too")
+    parser.add_argument("--seed", type=int, default=529)
+    args = parser.parse_args()
+
+    subreddits = (SUBREDDITS + ["subreddit" + str(i) for i in range(len(SUBREDDITS), args.subreddits)])
+    start = time.perf_counter()
+    rows = make_dataset(args.out, args.posts, subreddits[:args.subreddits], args.overlap, args.seed,
+                        selftext_length=args.selftext_length, link_density=args.link_density,
+                        text_rate=args.text_rate, covid_rate=args.covid_rate)
+    print("Wrote {} rows to {} in {:.1f} s".format(rows, args.out, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
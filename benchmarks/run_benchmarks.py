@@ -0,0 +1,218 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Times the hot paths of the project on a made up dataset and compares them to the saved baselines in
+benchmarks/baselines.json.  Every benchmark is measured relative to a reference workload of plain Python timed right
+before it in the same run, so the baselines hold for any machine and the load the machine is under.  A benchmark more
+than --tolerance slower than its baseline, relative to the reference, is a regression, and the run exits with 1 so a
+scheduled job fails.
+Run from the top folder of the project, ex.
+    python benchmarks/run_benchmarks.py                       # 10,000 posts made up in a temporary folder
+    python benchmarks/run_benchmarks.py --posts 1000000 --data /tmp/reddit_1m
+    python benchmarks/run_benchmarks.py --save                # saves the results as the new baselines
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import graph_data  # noqa: E402
+from columnar import write_columnar  # noqa: E402
+from enrich import enrich_rows, read_original  # noqa: E402
+from links import extract_links_bulk  # noqa: E402
+from make_dataset import SUBREDDITS, TIME_PERIODS, make_dataset  # noqa: E402
+from relevance import RelevanceClassifier, classify_parallel  # noqa: E402
+import snapshot  # noqa: E402
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+# Every benchmark gets the data folder and returns a function to time, which returns the number of rows it went
+# through.  Anything the benchmark needs is set up before it is timed.
+
+def bench_parse_data(data_dir):
+    return lambda: len(graph_data.load_data(SUBREDDITS, use_cache=False, columnar=False))
+
+
+def bench_parse_columnar(data_dir):
+    for subreddit in SUBREDDITS:
+        for time_period in TIME_PERIODS:
+            write_columnar(os.path.join(data_dir, "updated", subreddit + "_" + time_period + ".tsv"))
+    return lambda: len(graph_data.load_data(SUBREDDITS, use_cache=False, keep_content=False))
+
+
+def bench_snapshot_load(data_dir):
+    graph_data.load_data(SUBREDDITS)  # Saves the snapshot the benchmark loads
+    return lambda: len(graph_data.load_data(SUBREDDITS))
+
+
+def _original_rows(data_dir):
+    rows = list()
+    for subreddit in SUBREDDITS:
+        for time_period in TIME_PERIODS:
+            rows.extend(read_original(os.path.join(data_dir, "original", subreddit + "_" + time_period + ".tsv"))[1])
+    return rows
+
+
+def bench_enrich_rows(data_dir):
+    rows = _original_rows(data_dir)
+    return lambda: (enrich_rows(rows), len(rows))[1]
+
+
+def bench_extract_links(data_dir):
+    contents = [row[4] for row in _original_rows(data_dir)]
+    return lambda: len(extract_links_bulk(contents))
+
+
+def bench_relevance(data_dir):
+    classifier = RelevanceClassifier()
+    texts = [text for row in _original_rows(data_dir) for text in (row[0], row[4])]
+    return lambda: len(classifier.classify(texts))
+
+
+# Classifies the title and content of every post on a pool of one process per core
+def bench_relevance_parallel(data_dir):
+    classifier = RelevanceClassifier()
+    rows = _original_rows(data_dir)
+    titles = [row[0] for row in rows]
+    contents = [row[4] for row in rows]
+    return lambda: len(classify_parallel(classifier, titles, contents, chunk_rows=max(1, len(rows) // 16)))
+
+
+# The queries of the histograms and time series, on every subreddit
+def bench_aggregate(data_dir):
+    post_table = graph_data.load_data(SUBREDDITS)
+
+    def run():
+        for column in ["score", "num_comm"]:
+            post_table.aggregate(["subreddit", "relevant"], column)
+            post_table.aggregate(["subreddit", "has_sources"], column, relevant=True)
+            post_table.aggregate(["subreddit", "relevant", "weekday"], column)
+            post_table.aggregate(["subreddit", "relevant", "month"], column)
+        return len(post_table) * 8
+    return run
+
+
+# Builds the figures of every chart without writing them
+def bench_build_charts(data_dir):
+    import render
+    post_table = graph_data.load_data(SUBREDDITS)
+    return lambda: (render.build_all(post_table), len(post_table))[1]
+
+
+BENCHMARKS = {
+    "parse_data": bench_parse_data,
+    "parse_columnar": bench_parse_columnar,
+    "snapshot_load": bench_snapshot_load,
+    "enrich_rows": bench_enrich_rows,
+    "extract_links": bench_extract_links,
+    "relevance": bench_relevance,
+    "relevance_parallel": bench_relevance_parallel,
+    "aggregate": bench_aggregate,
+    "build_charts": bench_build_charts,
+}
+
+
+# The same work on every run, not using any of the project: splits tab separated rows and sums a number column by
+# a key column, the kind of work parsing and aggregating posts does.  Returns a function to time like a benchmark.
+def reference_workload(rows=200_000):
+    lines = ["post {}\t{}\t{}\tcontent of the post".format(row, row % 9973, row % 97) for row in range(rows)]
+
+    def run():
+        totals = dict()
+        for line in lines:
+            fields = line.split("\t")
+            totals[fields[2]] = totals.get(fields[2], 0) + int(fields[1])
+        return len(lines)
+    return run
+
+
+# Runs a function repeat times and keeps the fastest.  Returns rows per second.
+def time_function(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return rows / max(best, 1e-9)
+
+
+# Runs a benchmark and the reference workload right before it.  Returns rows per second of the benchmark and its
+# speed relative to the reference, the ratio of their rows per second.
+def run_benchmark(name, data_dir, repeat=5, reference=None):
+    function = BENCHMARKS[name](data_dir)
+    if reference is None:
+        reference = reference_workload()
+    reference_speed = time_function(reference, repeat)
+    speed = time_function(function, repeat)
+    return speed, speed / reference_speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the hot paths of the project against saved baselines")
+    parser.add_argument("--data", help="dataset folder, made with make_dataset.py if it doesn't exist.  A temporary "
+                                       "folder if not given.")
+    parser.add_argument("--posts", type=int, default=10_000, help="size of the dataset if it is made")
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), help="run only this benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.35, help="how much slower than the baseline, relative "
+                                                                       "to the reference workload, is allowed")
+    parser.add_argument("--save", action="store_true", help="save the results as the baselines")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="reddit_bench_")
+    if not os.path.exists(os.path.join(data_dir, "updated")):
+        print("Making {} posts in {}".format(args.posts, data_dir))
+        make_dataset(data_dir, args.posts)
+    snapshot.DATA_DIR = data_dir
+
+    try:
+        with open(BASELINES, "r", encoding="utf-8") as file:
+            baselines = json.load(file)
+    except OSError:
+        baselines = dict()
+
+    # Baselines are speeds relative to the reference workload, see run_benchmark
+    results = dict()
+    regressions = list()
+    reference = reference_workload()
+    print("{:<18} {:>12} {:>10} {:>10} {:>8}".format("benchmark", "rows/s", "relative", "baseline", "change"))
+    for name in args.only or BENCHMARKS:
+        try:
+            rows_per_sec, results[name] = run_benchmark(name, data_dir, args.repeat, reference)
+        except ImportError as error:  # A package the benchmark needs isn't installed
+            print("{:<18} skipped, {}".format(name, error))
+            continue
+
+        baseline = baselines.get(name)
+        if baseline is None:
+            print("{:<18} {:>12.0f} {:>10.4f} {:>10} {:>8}".format(name, rows_per_sec, results[name], "-", "-"))
+            continue
+        change = results[name] / baseline - 1
+        flag = ""
+        if change < -args.tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("{:<18} {:>12.0f} {:>10.4f} {:>10.4f} {:>+7.0%}{}".format(name, rows_per_sec, results[name], baseline,
+                                                                       change, flag))
+
+    if args.save:
+        baselines.update({name: round(relative, 4) for name, relative in results.items()})
+        with open(BASELINES, "w", encoding="utf-8") as file:
+            json.dump(baselines, file, indent=4, sort_keys=True)
+            file.write("\n")
+        print("Saved baselines to " + BASELINES)
+
+    if args.data is None:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
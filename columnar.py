@@ -0,0 +1,284 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Typed columnar files of the updated posts, written next to the updated .tsv files.  Numbers are stored as
+    numbers and sources as a list column, in row groups that are read one column at a time, so a chart only reads the
+    bytes of the columns it uses.
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+
+from post_table import TIME_FILTERS, parse_created, parse_sources, post_digest
+from relevance import RelevanceClassifier
+from tsv_reader import read_tsv
+
+
+# Start and end of every columnar file
+MAGIC = b"RCOL"
+VERSION = 1
+
+# Rows of a row group.  Each row group is read on its own, so a large file doesn't need to fit in memory at once.
+ROW_GROUP_ROWS = 65536
+
+# Columns of the files and their types
+#   int64, bool: fixed width arrays
+#   string, binary: UTF-8 text or bytes, stored as 32 bit offsets into one block of bytes for every row group
+#   list<string>: offsets into a string column, one list for every row
+#   title, content: text of the post, content is "" if the post has none
+#   created: UNIX timestamp of the date in the .tsv read as UTC, see parse_created
+#   sources: links in the content of the post
+#   id: Reddit id of the post, "" if the .tsv doesn't have one.  digest is then the hash parse_data makes the post
+#       from, so the same post has the same key whether it is read from the .tsv or the columnar file.
+#   relevant: if the classifier in the metadata of the file found a keyword in the title or content
+COLUMNS = [("title", "string"), ("score", "int64"), ("num_comm", "int64"), ("created", "int64"),
+           ("content", "string"), ("sources", "list<string>"), ("id", "string"), ("digest", "binary"),
+           ("relevant", "bool")]
+
+_TYPECODES = {"int64": "q", "bool": "b"}
+_FOOTER_LENGTH = struct.Struct("<Q")
+
+
+# Gets the columnar file written for an updated .tsv, ex. data/columnar/news_day.col for data/updated/news_day.tsv
+
+def columnar_location(updated_location):
+    folder = os.path.dirname(os.path.dirname(updated_location))
+    name = os.path.splitext(os.path.basename(updated_location))[0]
+    return os.path.join(folder, "columnar", name + ".col")
+
+
+# Gets the subreddit and time filter of a file named like news_day.tsv, ex. ("news", "day")
+
+def file_partition(location):
+    name = os.path.splitext(os.path.basename(location))[0]
+    sub_reddit_name, _, period = name.rpartition("_")
+    return sub_reddit_name, "all_time" if period == "all" else period
+
+
+# Arrays are stored little endian no matter the machine
+
+def _array_bytes(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _bytes_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_strings(values, binary=False):
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value if binary else value.encode("utf-8")
+        offsets.append(len(blob))
+    return _array_bytes(offsets) + bytes(blob)
+
+
+def _decode_strings(data, rows, binary=False):
+    offsets = _bytes_array("I", data[:4 * (rows + 1)])
+    blob = data[4 * (rows + 1):]
+    if binary:
+        return [blob[offsets[i]:offsets[i + 1]] for i in range(rows)]
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(rows)]
+
+
+# Encodes the values of one column of a row group
+def encode_column(column_type, values):
+    if column_type in _TYPECODES:
+        return _array_bytes(array(_TYPECODES[column_type], values))
+    if column_type == "string":
+        return _encode_strings(values)
+    if column_type == "binary":
+        return _encode_strings(values, binary=True)
+    if column_type == "list<string>":
+        lengths = array("I", [0])
+        for value in values:
+            lengths.append(lengths[-1] + len(value))
+        return _array_bytes(lengths) + _encode_strings([item for value in values for item in value])
+    raise ValueError("Unknown column type " + column_type)
+
+
+# Decodes one column of a row group with rows rows.  Numbers and flags are arrays, text is a list of str, lists are
+# tuples.
+def decode_column(column_type, data, rows):
+    if column_type in _TYPECODES:
+        return _bytes_array(_TYPECODES[column_type], data)
+    if column_type == "string":
+        return _decode_strings(data, rows)
+    if column_type == "binary":
+        return _decode_strings(data, rows, binary=True)
+    if column_type == "list<string>":
+        lengths = _bytes_array("I", data[:4 * (rows + 1)])
+        items = _decode_strings(data[4 * (rows + 1):], lengths[-1])
+        return [tuple(items[lengths[i]:lengths[i + 1]]) for i in range(rows)]
+    raise ValueError("Unknown column type " + column_type)
+
+
+# Writes a columnar file one row group at a time.  The file is written to a temporary file and only replaces path
+# when it is closed, so a half written file is never read.  ex.
+#   with ColumnarWriter(path, COLUMNS, {"subreddit": "news"}) as writer:
+#       writer.write_row_group({"title": titles, "score": scores, ...})
+#   metadata: anything JSON about the whole file, read back as ColumnarFile.metadata
+
+class ColumnarWriter:
+
+    def __init__(self, path, columns, metadata=None):
+        self.path = path
+        self.columns = columns
+        self.metadata = metadata or dict()
+        self.row_groups = list()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path + ".tmp", "wb")
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        if error_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self.path + ".tmp")
+
+    # Writes the values of every column for the rows of one row group.  The minimum and maximum of the int64 columns
+    # are kept in the footer so row groups can be skipped without reading them.
+    def write_row_group(self, values):
+        rows = len(values[self.columns[0][0]])
+        chunks = dict()
+        stats = dict()
+        for name, column_type in self.columns:
+            if len(values[name]) != rows:
+                raise ValueError("Column " + name + " has " + str(len(values[name])) + " rows, expected " + str(rows))
+            data = encode_column(column_type, values[name])
+            chunks[name] = [self._file.tell(), len(data)]
+            self._file.write(data)
+            if column_type == "int64" and rows > 0:
+                stats[name] = [min(values[name]), max(values[name])]
+        self.row_groups.append({"rows": rows, "chunks": chunks, "stats": stats})
+
+    def close(self):
+        footer = json.dumps({"version": VERSION, "columns": self.columns, "metadata": self.metadata,
+                             "row_groups": self.row_groups}).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(_FOOTER_LENGTH.pack(len(footer)))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+# A columnar file opened for reading.  Only the footer is read when it is opened, and then only the byte ranges of
+# the columns that are asked for.
+#   columns: {name: type}
+#   metadata: what the file was written with, ex. its subreddit and time filter
+#   row_groups: rows, chunks and stats of every row group
+
+class ColumnarFile:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            file.seek(-len(MAGIC) - _FOOTER_LENGTH.size, os.SEEK_END)
+            footer_length = _FOOTER_LENGTH.unpack(file.read(_FOOTER_LENGTH.size))[0]
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + " is not a columnar file")
+            file.seek(-len(MAGIC) - _FOOTER_LENGTH.size - footer_length, os.SEEK_END)
+            footer = json.loads(file.read(footer_length).decode("utf-8"))
+
+        if footer["version"] != VERSION:
+            raise ValueError(path + " is version " + str(footer["version"]) + ", expected " + str(VERSION))
+        self.columns = dict(footer["columns"])
+        self.metadata = footer["metadata"]
+        self.row_groups = footer["row_groups"]
+
+    def __len__(self):
+        return sum(row_group["rows"] for row_group in self.row_groups)
+
+    # Yields the columns of every row group as {name: values}.  Every column if columns is None.
+    #   where: only reads the row groups whose stats could have a matching row, ex. {"created": (start, end)} skips
+    #          row groups with no post created from start to end
+    def read(self, columns=None, where=None):
+        if columns is None:
+            columns = list(self.columns)
+        for name in columns:
+            if name not in self.columns:
+                raise KeyError(self.path + " has no column " + name)
+
+        with open(self.path, "rb") as file:
+            for row_group in self.row_groups:
+                if where is not None and not _may_match(row_group["stats"], where):
+                    continue
+                values = dict()
+                for name in columns:
+                    offset, length = row_group["chunks"][name]
+                    file.seek(offset)
+                    values[name] = decode_column(self.columns[name], file.read(length), row_group["rows"])
+                yield values
+
+    # Bytes of the columns in the file, ex. to see how much of the file a set of columns reads
+    def column_bytes(self, columns=None):
+        return sum(row_group["chunks"][name][1] for row_group in self.row_groups for name in columns or self.columns)
+
+
+def _may_match(stats, where):
+    for name, (low, high) in where.items():
+        if name in stats and (stats[name][1] < low or stats[name][0] > high):
+            return False
+    return True
+
+
+# Writes the columnar file of an updated .tsv, parsing it the same way parse_data does.  Posts are classified with
+# classifier, and its pattern is saved so parse_data only uses the relevant column when it would classify the same
+# way.  Returns the number of rows written.
+
+def write_columnar(updated_location, columnar_path=None, classifier=None, row_group_rows=ROW_GROUP_ROWS):
+    if columnar_path is None:
+        columnar_path = columnar_location(updated_location)
+    if classifier is None:
+        classifier = RelevanceClassifier()
+    sub_reddit_name, time_key = file_partition(updated_location)
+    metadata = {"subreddit": sub_reddit_name, "time_filter": time_key if time_key in TIME_FILTERS else None,
+                "pattern": classifier.pattern.pattern, "flags": classifier.pattern.flags}
+
+    rows = 0
+    with ColumnarWriter(columnar_path, COLUMNS, metadata) as writer:
+        values = {name: list() for name, _ in COLUMNS}
+        for record in read_tsv(updated_location, columns=[name for name, _ in COLUMNS if name != "digest"]):
+            raw_content = record.raw("content")
+            values["title"].append(record["title"])
+            values["score"].append(int(record["score"]))
+            values["num_comm"].append(int(record["num_comm"]))
+            values["created"].append(parse_created(record["created"]))
+            values["content"].append(record["content"] if raw_content != b"None" else "")
+            values["sources"].append(parse_sources(record["sources"]) if record.raw("sources") != b"None" else ())
+            values["id"].append(record["id"])
+            values["digest"].append(b"" if record["id"] != "" else post_digest(
+                record.raw("title"), raw_content, record.raw("created")))
+            values["relevant"].append(classifier.is_relevant(record["title"]) or
+                                      (raw_content != b"None" and classifier.is_relevant(raw_content)))
+            rows += 1
+
+            if len(values["title"]) == row_group_rows:
+                writer.write_row_group(values)
+                values = {name: list() for name, _ in COLUMNS}
+        if len(values["title"]) > 0 or rows == 0:
+            writer.write_row_group(values)
+
+    return rows
+
+
+# Writes the columnar file of every updated .tsv in a folder, ex. python columnar.py data/updated
+if __name__ == "__main__":
+    updated_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "updated")
+    for file_name in sorted(os.listdir(updated_dir)):
+        if file_name.endswith(".tsv"):
+            location = os.path.join(updated_dir, file_name)
+            print("{}: {} rows".format(columnar_location(location), write_columnar(location)))
@@ -0,0 +1,79 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Loads the posts of a subreddit and time filter only when they are first asked for, and keeps only the
+    most recently used ones in memory, so any number of subreddits can be graphed in one long running process
+"""
+from collections import OrderedDict
+
+from graph_data import REGISTRY, load_data
+from post_table import PostTable, TIME_FILTERS
+
+
+# Posts of (subreddit, time filter) partitions, each loaded from its own updated .tsv file.  When more than
+# max_partitions are loaded, or they take up more than max_bytes, the partitions used longest ago are dropped and
+# loaded again the next time they are asked for.  ex.
+#   dataset = Dataset(max_partitions=8)
+#   graph_time_series_engagement_daily("News", dataset.table(["news"]), "score")
+#   max_bytes: memory limit of all partitions together, see PostTable.nbytes.  No limit if None.
+#   classifier, keep_content, utc_offset: how partitions are loaded, see load_data
+
+class Dataset:
+
+    def __init__(self, max_partitions=16, max_bytes=None, classifier=None, keep_content=True, utc_offset=0):
+        self.max_partitions = max_partitions
+        self.max_bytes = max_bytes
+        self.classifier = classifier
+        self.keep_content = keep_content
+        self.utc_offset = utc_offset
+        self.loads = 0
+        self._partitions = OrderedDict()
+        self._sizes = dict()
+
+    def __len__(self):
+        return len(self._partitions)
+
+    def __contains__(self, partition):
+        return (partition[0].lower(), partition[1]) in self._partitions
+
+    # Bytes taken up by the partitions that are loaded
+    def resident_bytes(self):
+        return sum(self._sizes.values())
+
+    # Gets the posts of one subreddit and time filter, loading them if they aren't loaded
+    def partition(self, sub_reddit_name, time_key):
+        if time_key not in TIME_FILTERS:
+            raise ValueError("Unknown time filter " + time_key + ", expected one of " + ", ".join(TIME_FILTERS))
+        key = (sub_reddit_name.lower(), time_key)
+
+        if key in self._partitions:
+            self._partitions.move_to_end(key)
+            return self._partitions[key]
+
+        post_table = load_data([key[0]], self.classifier, keep_content=self.keep_content, utc_offset=self.utc_offset,
+                               time_filters=[time_key])
+        self.loads += 1
+        self._partitions[key] = post_table
+        self._sizes[key] = post_table.nbytes()
+        self._evict()
+        return post_table
+
+    # Gets the posts of every time filter of every subreddit as one new PostTable, for the graph functions.  Every
+    # time filter of the registry if time_filters is None.
+    def table(self, sub_reddit_names, time_filters=None):
+        post_table = PostTable(self.utc_offset)
+        for sub_reddit_name in sub_reddit_names:
+            for time_key in time_filters or REGISTRY.time_filters:
+                post_table.extend(self.partition(sub_reddit_name, time_key))
+        return post_table
+
+    # Drops every loaded partition
+    def clear(self):
+        self._partitions.clear()
+        self._sizes.clear()
+
+    # Drops the partitions used longest ago until the limits are met.  The newest partition is always kept.
+    def _evict(self):
+        while len(self._partitions) > 1 and (len(self._partitions) > self.max_partitions or (
+                self.max_bytes is not None and self.resident_bytes() > self.max_bytes)):
+            key, _ = self._partitions.popitem(last=False)
+            del self._sizes[key]
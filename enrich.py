@@ -0,0 +1,136 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Adds the sources found in the content of each post to the rows of the original .tsv files
+"""
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from columnar import write_columnar
+from instrument import stage, timed
+from links import extract_links, extract_links_bulk
+
+
+# Columns of the updated .tsv files
+COLUMNS = ['title', 'score', 'num_comm', 'created', 'content', 'sources']
+
+
+# Gets the sources that are in the post if it is in the content.  sources can be given if the links of the content
+# were already found with extract_links_bulk.
+def list_post_sources(entry, sources=None):
+    # filters out for posts that have content and if they have a source in the content
+    if len(entry) == 5 and sources is None:
+        sources = extract_links(entry[4])
+    if len(entry) != 5 or len(sources) == 0:
+        entry.pop()  # Removes the blank entry for content and replaces it with none then fills sources with none
+        entry.append('None')
+        entry.append('None')
+        return entry
+    entry.append(sources)
+    return entry
+
+
+# Reads the rows of an original .tsv.  Returns the column names (empty if the file has no header) and the rows.
+def read_original(file_location):
+    with open(file_location, 'r', encoding='utf-8') as file:
+        reader = csv.reader(file, delimiter='\t')
+        rows = [row for row in reader if len(row) != 0]
+
+    columns = rows[0] if len(rows) > 0 and rows[0][0] == 'title' else list()
+    rows = [row for row in rows if row[0] != 'title']
+    return columns, rows
+
+
+# Column names of the updated .tsv.  The Reddit id of each post is kept if the original .tsv has it.
+def updated_columns(columns):
+    if 'id' in columns:
+        return COLUMNS + ['id']
+    return COLUMNS
+
+
+# Adds the sources to a list of original rows.  Returns the rows written as .tsv text.
+@timed()
+def enrich_rows(rows, id_index=None):
+    text = io.StringIO()
+    writer = csv.writer(text, delimiter='\t')
+
+    # Only the first five columns are the post itself
+    entries = [row[:5] for row in rows]
+
+    # Finds the links of every post in one go
+    file_sources = extract_links_bulk(entry[4] if len(entry) == 5 else '' for entry in entries)
+    for row, entry, sources in zip(rows, entries, file_sources):
+        entry = list_post_sources(entry, sources)
+        if id_index is not None:
+            entry.append(row[id_index])
+        writer.writerow(entry)
+
+    return text.getvalue()
+
+
+# Goes through an entire original .tsv and writes the updated .tsv with the sources of every post, and the typed
+# columnar file of it that parse_data reads instead, see columnar.py.  Returns the number of rows, the number of
+# bytes read and the seconds it took.
+def enrich_file(original_location, updated_location, columnar=True):
+    start = time.perf_counter()
+    with stage('enrich_file', file=original_location) as enriching:
+        columns, rows = read_original(original_location)
+        id_index = columns.index('id') if 'id' in columns else None
+
+        with open(updated_location, 'w', encoding='utf-8') as new:
+            csv.writer(new, delimiter='\t').writerow(updated_columns(columns))
+            new.write(enrich_rows(rows, id_index))
+        if columnar:
+            write_columnar(updated_location)
+
+        enriching.rows = len(rows)
+        enriching.bytes = os.path.getsize(original_location)
+
+    return enriching.rows, enriching.bytes, time.perf_counter() - start
+
+
+def _report(updated_location, row_count, byte_count, seconds):
+    print('{}: {} rows, {:.1f} MB in {:.2f} s ({:.0f} rows/s)'.format(
+        updated_location, row_count, byte_count / 1e6, seconds, row_count / max(seconds, 1e-9)))
+
+
+# Enriches many files at the same time with a pool of processes.  Every file is the same as if enrich_file wrote it.
+#   file_pairs: list of (original .tsv, updated .tsv)
+#   processes: size of the pool, one per core if None
+#   chunk_rows: also splits every file into chunks of this many rows so one large file is spread across the pool
+#   columnar: also write the columnar file of every updated .tsv
+# Returns {updated .tsv: (rows, bytes read, seconds)}
+def enrich_files(file_pairs, processes=None, chunk_rows=None, report=True, columnar=True):
+    results = dict()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        if chunk_rows is None:
+            futures = {pool.submit(enrich_file, original, updated, columnar): updated
+                       for original, updated in file_pairs}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if report:
+                    _report(futures[future], *results[futures[future]])
+            return results
+
+        for original, updated in file_pairs:
+            start = time.perf_counter()
+            columns, rows = read_original(original)
+            id_index = columns.index('id') if 'id' in columns else None
+            chunks = [pool.submit(enrich_rows, rows[i:i + chunk_rows], id_index)
+                      for i in range(0, len(rows), chunk_rows)]
+
+            # Chunks are written in the order of the file no matter which finishes first
+            with open(updated, 'w', encoding='utf-8') as new:
+                csv.writer(new, delimiter='\t').writerow(updated_columns(columns))
+                for chunk in chunks:
+                    new.write(chunk.result())
+            if columnar:
+                write_columnar(updated)
+
+            results[updated] = (len(rows), os.path.getsize(original), time.perf_counter() - start)
+            if report:
+                _report(updated, *results[updated])
+
+    return results
@@ -0,0 +1,108 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: A stand-in for praw.Reddit that serves made up listings, so scraping can be run without going online.
+    ex. scrape_all(["news"], ["day"], lambda: FakeReddit(latency=0.2), out_dir="/tmp/scrape")
+"""
+import copy
+import random
+import threading
+import time
+
+from scraper import PAGE_SIZE
+
+
+# Made up post with the same attributes the scraper reads from a praw Submission
+class FakeSubmission:
+
+    def __init__(self, id, title, score, num_comments, created, selftext):
+        self.id = id
+        self.name = "t3_" + id
+        self.title = title
+        self.score = score
+        self.num_comments = num_comments
+        self.created = created
+        self.selftext = selftext
+
+
+class FakeSubreddit:
+
+    def __init__(self, reddit, display_name):
+        self._reddit = reddit
+        self.display_name = display_name
+
+    # Yields the posts of a listing, sleeping for the latency of the client before every page of PAGE_SIZE posts.
+    # params={"after": fullname} starts after that post like it does on Reddit.  params is copied and added to the
+    # same way praw does, so params=None fails like it does with praw.
+    def top(self, limit=1000, time_filter="all", **generator_kwargs):
+        params = copy.deepcopy(generator_kwargs["params"]) if "params" in generator_kwargs else dict()
+        params.update(t=time_filter)
+        posts = self._reddit.listing(self.display_name, time_filter)
+        self._reddit.start_request()
+
+        start = 0
+        if params.get("after"):
+            names = [post.name for post in posts]
+            if params["after"] in names:
+                start = names.index(params["after"]) + 1
+
+        for i, post in enumerate(posts[start:start + limit]):
+            if i % PAGE_SIZE == 0:
+                time.sleep(self._reddit.latency)
+            yield post
+
+
+# Client with the same subreddit(name).top(...) calls as praw.Reddit
+#   listings: {(subreddit, time_filter): [FakeSubmission, ...]}, listings that aren't given are made up
+#   latency: seconds every page of a listing takes
+#   failures: number of listings that fail with an error before any succeed, to try out retries
+#   posts_per_listing: size of made up listings
+
+class FakeReddit:
+
+    def __init__(self, listings=None, latency=0.0, failures=0, posts_per_listing=1000, seed=529):
+        self.listings = dict(listings) if listings is not None else dict()
+        self.latency = latency
+        self.failures = failures
+        self.posts_per_listing = posts_per_listing
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def subreddit(self, display_name):
+        return FakeSubreddit(self, display_name)
+
+    # Counts a listing request and fails it if there are failures left
+    def start_request(self):
+        with self._lock:
+            self.requests += 1
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("FakeReddit: made up failure")
+
+    # Gets the posts of a listing, making them up the first time they are asked for
+    def listing(self, subreddit, time_filter):
+        key = (subreddit, time_filter)
+        with self._lock:
+            if key not in self.listings:
+                self.listings[key] = make_listing(subreddit, time_filter, self.posts_per_listing, self.seed)
+            return self.listings[key]
+
+
+# Makes up a listing sorted by score like a top listing.  The same arguments always give the same listing.
+def make_listing(subreddit, time_filter, size, seed=529):
+    generator = random.Random("{}:{}:{}".format(seed, subreddit, time_filter))
+    words = ["covid", "vaccine", "study", "new", "cases", "report", "pandemic", "city", "election", "science"]
+    now = 1603600000
+
+    posts = list()
+    for i in range(size):
+        title = " ".join(generator.choice(words) for _ in range(8))
+        selftext = ""
+        if generator.random() < 0.2:
+            selftext = "See [the source](https://example.org/{}/{}) for more.".format(subreddit, i)
+        posts.append(FakeSubmission("{}{}{:05d}".format(subreddit[:3], time_filter[:1], i), title,
+                                    generator.randint(1, 200000), generator.randint(0, 20000),
+                                    now - generator.randint(0, 365 * 24 * 3600), selftext))
+
+    posts.sort(key=lambda post: post.score, reverse=True)
+    return posts
@@ -1,127 +1,225 @@
 """
 authors: Parker, Anthony, Drake, Grace
-description: Parses through tsv files and graphs data that was gathered from Reddit
+description: Parses through tsv files and graphs data that was gathered from Reddit.  plotly is only imported by the
+    graph functions, so the data can be loaded without it, ex. by the benchmarks.
 """
-import re
-import csv
-import plotly.graph_objects as go
-import datetime
-
-
-# Post object that represents a single Reddit post.  Attributes are the following...
-#   ID: id number to reference a post
-#   Title: title of the post
-#   Score: Sum of the "likes"/upvotes minus the sum of the "dislikes"/downvotes.
-#   Num_Comm: Number of comments
-#   Created: Date posted
-#   Content: The text content of the post.  Content with images do not appear.
-#   Relevant:  If it is in regards to COVID-19 in any way.
-#   Sources: List of websites listed in the content of the post.
-
-class Post:
-
-    def __init__(self):
-        self.id = None
-        self.title = ""
-        self.score = 0
-        self.num_comm = 0
-        self.created = ""
-        self.content = ""
-        self.relevant = False
-        self.sources = list()
-
-    def __eq__(self, other):
-        if self.title == other.title and self.content == other.content:
-            return True
-        return False
-
-
-# Parses through the updated .tsv files for data to be graphed.  Stores the data in dictionaries of Post objects
-
-def parse_data(sub_reddit_name, sub_reddit_dict):
-    file_list = [
-        "{name}_all.tsv".format(name=sub_reddit_name),
-        "{name}_day.tsv".format(name=sub_reddit_name),
-        "{name}_month.tsv".format(name=sub_reddit_name),
-        "{name}_week.tsv".format(name=sub_reddit_name)
-    ]
-
-    sub_reddit_dict["all_time"] = dict()
-    sub_reddit_dict["day"] = dict()
-    sub_reddit_dict["month"] = dict()
-    sub_reddit_dict["week"] = dict()
-
-    for file_name in file_list:
-        file = open("data/updated/" + file_name, "r", encoding="utf8")
-        reader = csv.reader(file, delimiter="\t")
-
-        post_count = 0
-        for entry in reader:
-            if post_count == 0:
-                post_count += 1
-                cols = entry
-
-            elif len(entry) != 0:
-
-                post = Post()
-
-                post.id = post_count
-                post.title = entry[0]
-                post.score = entry[1]
-                post.num_comm = entry[2]
-                post.created = entry[3]
-
-                post_count += 1
-
-                if sub_reddit_name == "coronavirus":
-                    post.relevant = True
-                elif re.search("coronavirus", post.title, re.IGNORECASE) or \
-                        re.search("covid", post.title, re.IGNORECASE) or \
-                        re.search("sars-cov-2", post.title, re.IGNORECASE) or \
-                        re.search("pandemic", post.title, re.IGNORECASE) or \
-                        re.search("corona", post.title, re.IGNORECASE):
-                    post.relevant = True
+import argparse
+import os
+import sys
+
+from aggregate import series
+from columnar import ColumnarFile
+import instrument
+from instrument import stage, timed
+from post_table import PostTable, parse_sources, post_digest
+from relevance import classify_parallel
+import snapshot
+from snapshot import COVID_CLASSIFIER, REGISTRY, data_files, load_snapshot, snapshot_settings
+from sqlite_store import SqliteStore, connect
+from tsv_reader import read_tsv
+
+# Columns of the updated .tsv files that are graphed
+TSV_COLUMNS = ["title", "score", "num_comm", "created", "content", "sources", "id"]
+
+
+# Parses through the updated .tsv or columnar files for data to be graphed.  Stores the data as rows of a PostTable.
+# The classifier decides which posts are COVID related, the default searches for DEFAULT_KEYWORDS.
+# keep_content=False leaves the content of posts out of the table.  The content is still searched for keywords but
+# never decoded, which is all the score, comment and time charts need.
+# time_filters: only the files of these time filters are read, every time filter of the registry if None
+# columnar: read the columnar files of the time filters that have them, see data_files
+# classify=False doesn't search posts for keywords and adds them with relevant None, for load_data to classify them
+# all at once
+
+def parse_data(sub_reddit_name, post_table, classifier=None, keep_content=True, time_filters=None, columnar=True,
+               classify=True):
+    if classifier is None:
+        classifier = COVID_CLASSIFIER
+    if time_filters is None:
+        time_filters = REGISTRY.time_filters
+    all_relevant = REGISTRY.get(sub_reddit_name).all_relevant
+
+    for time_key, file_name in zip(time_filters, data_files(sub_reddit_name, time_filters, columnar)):
+        with stage("parse_data", subreddit=sub_reddit_name, time_filter=time_key) as parsing:
+            if file_name.endswith(".col"):
+                parsing.rows, parsing.bytes = parse_columnar(sub_reddit_name, time_key, file_name, post_table,
+                                                             classifier, keep_content, all_relevant, classify)
+                continue
+
+            parsing.bytes = os.path.getsize(file_name)
+            for record in read_tsv(file_name, columns=TSV_COLUMNS):
+                title = record["title"]
+                content = ""
 
                 # If the post doesn't have text content.  Most likely an image.
-                if entry[4] != "None":
-                    post.content = entry[4]
+                if keep_content and record.raw("content") != b"None":
+                    content = record["content"]
 
-                    # Search the content for keywords
-                    if re.search("coronavirus", post.content, re.IGNORECASE) or \
-                            re.search("covid", post.content, re.IGNORECASE) or \
-                            re.search("sars-cov-2", post.content, re.IGNORECASE) or \
-                            re.search("pandemic", post.content, re.IGNORECASE) or \
-                            re.search("corona", post.content, re.IGNORECASE):
-                        post.relevant = True
+                # Every post of some subreddits is related, ex. r/Coronavirus.  Otherwise search the title and
+                # content for keywords, if the post has content.
+                if not classify:
+                    relevant = True if all_relevant else None
+                else:
+                    relevant = all_relevant or classifier.is_relevant(title) or \
+                        (record.raw("content") != b"None" and classifier.is_relevant(record.raw("content")))
+
+                sources = parse_sources(record["sources"]) if record.raw("sources") != b"None" else ()
+
+                # The same post is in more than one time filter, so it is only added once
+                post_id = record["id"]
+                if post_id == "":
+                    post_id = post_digest(record.raw("title"), record.raw("content"), record.raw("created"))
+
+                post_table.append(sub_reddit_name, time_key, title, record["score"], record["num_comm"],
+                                  record["created"], content, relevant, sources, post_id)
+                parsing.rows += 1
+
+
+# Adds the posts of a columnar file to a PostTable the same way parse_data adds the posts of its .tsv.  Only the
+# columns that are needed are read: the content is skipped when it isn't kept and the file was classified with the
+# same keywords as classifier.  Returns the number of rows and the bytes read.
+
+def parse_columnar(sub_reddit_name, time_key, file_name, post_table, classifier, keep_content, all_relevant,
+                   classify=True):
+    columnar_file = ColumnarFile(file_name)
+    same_classifier = columnar_file.metadata.get("pattern") == classifier.pattern.pattern and \
+        columnar_file.metadata.get("flags") == classifier.pattern.flags
+
+    columns = ["title", "score", "num_comm", "created", "sources", "id", "digest"]
+    if not all_relevant and same_classifier:
+        columns.append("relevant")
+    if keep_content or not (all_relevant or same_classifier):
+        columns.append("content")
+
+    rows = 0
+    for values in columnar_file.read(columns):
+        for i, title in enumerate(values["title"]):
+            content = values["content"][i] if "content" in values else ""
+            if all_relevant:
+                relevant = True
+            elif same_classifier:
+                relevant = values["relevant"][i] == 1
+            elif not classify:
+                relevant = None
+            else:
+                relevant = classifier.is_relevant(title) or classifier.is_relevant(content)
+
+            post_table.append(sub_reddit_name, time_key, title, values["score"][i], values["num_comm"][i],
+                              values["created"][i] - post_table.utc_offset, content if keep_content else "",
+                              relevant, values["sources"][i], values["id"][i] or values["digest"][i])
+        rows += len(values["title"])
+    return rows, columnar_file.column_bytes(columns)
+
+
+# Loads the posts of every subreddit into one PostTable.  The parsed table is saved as a snapshot and loaded instead of
+# parsing the .tsv files again, until one of the files changes.  The index of its sources is built before the table is
+# saved, so tables loaded from a snapshot have it, see PostTable.source_index.  Without the cache it is built by the
+# charts that use it.
+#   utc_offset: seconds ahead of UTC of the local time the .tsv dates were scraped in, see parse_created
+#   time_filters: only loads the posts of these time filters, every time filter of the registry if None
+#   columnar: read the columnar files of the time filters that have them instead of their .tsv, see data_files
+#   processes: classify the posts on a pool of this many processes once they are all read, see classify_parallel,
+#              instead of one at a time as they are read.  Faster on many cores when posts have long content.
+
+def load_data(sub_reddit_names, classifier=None, use_cache=True, keep_content=True, utc_offset=0,
+              time_filters=None, columnar=True, processes=None):
+    if classifier is None:
+        classifier = COVID_CLASSIFIER
+    if time_filters is None:
+        time_filters = REGISTRY.time_filters
+
+    @timed("build_table")
+    def build():
+        post_table = PostTable(utc_offset)
+        if processes is None:
+            for sub_reddit_name in sub_reddit_names:
+                parse_data(sub_reddit_name, post_table, classifier, keep_content, time_filters, columnar)
+        else:
+            # The content is kept until the posts are classified
+            for sub_reddit_name in sub_reddit_names:
+                parse_data(sub_reddit_name, post_table, classifier, True, time_filters, columnar, classify=False)
+            classify_table(post_table, classifier, processes)
+            if not keep_content:
+                post_table.contents = [""] * len(post_table)
+        return post_table
 
-                if entry[5] != "None":
-                    source_string = entry[5][1:len(entry[5]) - 1]
-                    post.sources = source_string.split(",")
+    if not use_cache:
+        return build()
 
-                if file_name == file_list[0]:
-                    sub_reddit_dict["all_time"][post.id] = post
-                elif file_name == file_list[1]:
-                    sub_reddit_dict["day"][post.id] = post
-                elif file_name == file_list[2]:
-                    sub_reddit_dict["month"][post.id] = post
-                elif file_name == file_list[3]:
-                    sub_reddit_dict["week"][post.id] = post
+    def build_snapshot():
+        post_table = build()
+        post_table.source_index()
+        return post_table
 
-        file.close()
+    name, key, source_paths = snapshot_settings(sub_reddit_names, classifier, keep_content, utc_offset, time_filters,
+                                                columnar)
+    with stage("load_data", subreddits=sub_reddit_names, time_filters=time_filters) as loading:
+        post_table = load_snapshot(name, source_paths, build_snapshot, key,
+                                   os.path.join(snapshot.DATA_DIR, "cache"))
+        loading.rows = len(post_table)
+    return post_table
 
 
-#   Graphs a pie chart of the number of COVID related posts vs the non-covid related posts
+# Classifies the posts of a table that parse_data added with classify=False on a pool of processes
+
+def classify_table(post_table, classifier, processes=None):
+    rows = [row for row, relevant in enumerate(post_table.relevant) if relevant == -1]
+    flags = classify_parallel(classifier, [post_table.titles[row] for row in rows],
+                              [post_table.contents[row] for row in rows], processes)
+    for row, relevant in zip(rows, flags):
+        post_table.relevant[row] = relevant
+
+
+# Gets the subreddits that have posts in the table, in the order of the registry and then any that aren't in it
+
+def table_subreddits(post_table):
+    subreddits = [subreddit for subreddit in REGISTRY if post_table.subreddit_id(subreddit.name) != -1]
+    subreddits.extend(REGISTRY.get(name) for name in post_table.subreddits if name not in REGISTRY)
+    return subreddits
+
 
-def graph_covid_post_count(sub_reddit_name, sub_reddit_dict):
-    covid_count, total_posts = 0, 0
+# Gets the PostTable column that holds the chosen engagement type
 
-    for time_key in sub_reddit_dict.keys():
-        for post_id in sub_reddit_dict[time_key].keys():
-            post = sub_reddit_dict[time_key][post_id]
-            total_posts += 1
+def engagement_column(engagement_type):
+    if engagement_type == "score":
+        return "score"
+    return "num_comm"
+
+
+# Names the time filters a chart of every time filter was made from, for its title, ex. "Time Filters: Day, Week".
+# "All Time Filters" if time_filters is None or every time filter of the registry.
+
+def time_filters_title(time_filters=None):
+    if time_filters is None or set(time_filters) == set(REGISTRY.time_filters):
+        return "All Time Filters"
+    names = list()
+    for time_key in time_filters:
+        if time_key.replace("_", " ").title() not in names:
+            names.append(time_key.replace("_", " ").title())
+    return ("Time Filter: " if len(names) == 1 else "Time Filters: ") + ", ".join(names)
+
+
+# Opens a figure in the browser
+
+@timed("show")
+def show_figure(fig):
+    fig.show()
 
-            if post.relevant:
-                covid_count += 1
+
+#   Graphs a pie chart of the number of COVID related posts vs the non-covid related posts
+#   Each pie counts the posts of its own time filter, so a post in the listings of several time filters is in each of
+#   their pies.  The pies of different time filters don't add up to the posts of the subreddit.
+#   Returns a figure for every time filter, or for every one of time_filters, which are only opened in the browser if
+#   show is True
+
+@timed()
+def graph_covid_post_count(sub_reddit_name, post_table, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    figures = list()
+    name = REGISTRY.get(sub_reddit_name).name
+    for time_key in time_filters or REGISTRY.time_filters:
+        total_posts = post_table.count(post_table.mask(subreddit=name, time_filter=time_key))
+        covid_count = post_table.count(post_table.mask(subreddit=name, time_filter=time_key, relevant=True))
 
         labels = ["COVID Related Posts", "Other Posts"]
         values = [covid_count, total_posts - covid_count]
@@ -162,24 +260,27 @@ def graph_covid_post_count(sub_reddit_name, sub_reddit_dict):
             font=dict(size=20),
         )
 
-        fig.show()
-        covid_count, total_posts = 0, 0
-
-
-#   Graphs a pie chart of the number of COVID related posts that have sources or not
-
-def graph_sources_in_covid_posts(sub_reddit_name, sub_reddit_dict):
-    source_count, total_covid_posts = 0, 0
+        figures.append(fig)
+        if show:
+            show_figure(fig)
 
-    for time_key in sub_reddit_dict.keys():
-        for post_id in sub_reddit_dict[time_key].keys():
-            post = sub_reddit_dict[time_key][post_id]
+    return figures
 
-            if post.relevant:
-                total_covid_posts += 1
 
-                if len(post.sources) > 0:
-                    source_count += 1
+#   Graphs a pie chart of the number of COVID related posts that have sources or not
+#   Returns a figure for every time filter, or for every one of time_filters, which are only opened in the browser if
+#   show is True
+
+@timed()
+def graph_sources_in_covid_posts(sub_reddit_name, post_table, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    figures = list()
+    name = REGISTRY.get(sub_reddit_name).name
+    for time_key in time_filters or REGISTRY.time_filters:
+        total_covid_posts = post_table.count(
+            post_table.mask(subreddit=name, time_filter=time_key, relevant=True))
+        source_count = post_table.count(
+            post_table.mask(subreddit=name, time_filter=time_key, relevant=True, has_sources=True))
 
         labels = ["Posts with Provided Sources", "Posts without Sources"]
         values = [source_count, total_covid_posts - source_count]
@@ -218,61 +319,30 @@ def graph_sources_in_covid_posts(sub_reddit_name, sub_reddit_dict):
             },
             font=dict(size=17)
         )
-        fig.show()
-        source_count, total_covid_posts = 0, 0
+        figures.append(fig)
+        if show:
+            show_figure(fig)
+
+    return figures
 
 
 #   Graphs a double bar Histogram comparing the average engagement (upvotes or comments) for covid posts vs non-covid posts
-#   Calculated average is the mean value
+#   Calculated average is the mean value.  Every post is counted once, even when it is in the listings of several
+#   time filters.
+#   Returns the figure, which is only opened in the browser if show is True
+#   time_filters: the time filters the table was loaded with, named in the title
 
-def graph_covid_engagement(data_dict, engagement_type):
-    tracker = dict()
-    covid_engagement_values = [None, None, None, None]
-    non_covid_engagement_values = [None, None, None, None]
-
-    for sub_reddit_name in data_dict.keys():
-        sub_reddit_dict = data_dict[sub_reddit_name]
-        covid_count, non_covid_count = 0, 0
-        covid_engagement_count, non_covid_engagement_count = 0, 0
-
-        for time_key in sub_reddit_dict.keys():
-            for post_id in sub_reddit_dict[time_key]:
-                post = sub_reddit_dict[time_key][post_id]
-
-                if post.title not in tracker.keys():
-                    tracker[post.title] = 1
-
-                    if engagement_type == "score":
-                        if post.relevant:
-                            covid_count += 1
-                            covid_engagement_count += int(post.score)
-                        else:
-                            non_covid_count += 1
-                            non_covid_engagement_count += int(post.score)
-                    elif engagement_type == "comments":
-                        if post.relevant:
-                            covid_count += 1
-                            covid_engagement_count += int(post.num_comm)
-                        else:
-                            non_covid_count += 1
-                            non_covid_engagement_count += int(post.num_comm)
-
-        if sub_reddit_name == "Coronavirus":
-            covid_engagement_values[0] = covid_engagement_count / covid_count
-            non_covid_engagement_values[0] = 0  # Subreddit Rules for r/Coronavirus makes it so any non-covid related post is removed
-        elif sub_reddit_name == "News":
-            covid_engagement_values[1] = covid_engagement_count / covid_count
-            non_covid_engagement_values[1] = non_covid_engagement_count / non_covid_count
-        elif sub_reddit_name == "Science":
-            covid_engagement_values[2] = covid_engagement_count / covid_count
-            non_covid_engagement_values[2] = non_covid_engagement_count / non_covid_count
-        else:
-            covid_engagement_values[3] = covid_engagement_count / covid_count
-            non_covid_engagement_values[3] = non_covid_engagement_count / non_covid_count
+@timed()
+def graph_covid_engagement(post_table, engagement_type, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    means = post_table.aggregate(["subreddit", "relevant"], engagement_column(engagement_type))["mean"]
+    subreddits = table_subreddits(post_table)
 
-        tracker.clear()
+    # Subreddit Rules for r/Coronavirus makes it so any non-covid related post is removed, so its mean is 0
+    covid_engagement_values = series(means, [(subreddit.name, 1) for subreddit in subreddits])
+    non_covid_engagement_values = series(means, [(subreddit.name, 0) for subreddit in subreddits])
 
-    labels = ["Coronavirus", "News", "Science", "WorldNews"]
+    labels = [subreddit.label for subreddit in subreddits]
 
     if engagement_type == "score":
         fig = go.Figure(data=[
@@ -281,7 +351,7 @@ def graph_covid_engagement(data_dict, engagement_type):
         ])
 
         fig.update_layout(
-            title="Average Upvotes for Posts Related and Not Related to Covid - All SubReddits, All Time Filters",
+            title="Average Upvotes for Posts Related and Not Related to Covid - All SubReddits, " + time_filters_title(time_filters),
             xaxis_title="Subreddit",
             yaxis_title="Score",
             font=dict(size=20)
@@ -293,7 +363,7 @@ def graph_covid_engagement(data_dict, engagement_type):
         ])
 
         fig.update_layout(
-            title="Average Number of Comments for Posts Related and Not Related to Covid - All SubReddits, All Time Filters",
+            title="Average Number of Comments for Posts Related and Not Related to Covid - All SubReddits, " + time_filters_title(time_filters),
             xaxis_title="Subreddit",
             yaxis_title="Comments",
             font=dict(size=20)
@@ -302,62 +372,36 @@ def graph_covid_engagement(data_dict, engagement_type):
     fig.update_xaxes(showgrid=True, gridcolor="rgb(140,140,140)")
     fig.update_yaxes(showgrid=True, gridcolor="rgb(140,140,140)")
 
-    fig.show()
+    if show:
+        show_figure(fig)
+    return fig
 
 
 #   Graphs a double bar Histogram comparing the average engagement (upvotes or comments) for covid posts with/without sources
 #   Calculated average is the mean value
+#   Returns the figure, which is only opened in the browser if show is True
+#   time_filters: the time filters the table was loaded with, named in the title
+
+@timed()
+def graph_covid_source_engagement(post_table, engagement_type, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    source_engagement_values = list()
+    non_source_engagement_values = list()
+    column = engagement_column(engagement_type)
+    source_means = post_table.aggregate(["subreddit", "has_sources"], column, relevant=True)["mean"]
+    subreddit_means = post_table.aggregate(["subreddit"], column, relevant=True)["mean"]
+
+    subreddits = table_subreddits(post_table)
+
+    for subreddit in subreddits:
+        if subreddit.all_linked:  # Every post links to a source, ex. r/WorldNews
+            source_engagement_values.append(subreddit_means.get((subreddit.name,), 0))
+            non_source_engagement_values.append(0)
+        else:
+            source_engagement_values.append(source_means.get((subreddit.name, 1), 0))
+            non_source_engagement_values.append(source_means.get((subreddit.name, 0), 0))
 
-def graph_covid_source_engagement(data_dict, engagement_type):
-    tracker = dict()
-    source_engagement_values = [None, None, None, None]
-    non_source_engagement_values = [None, None, None, None]
-
-    for sub_reddit_name in data_dict.keys():
-        sub_reddit_dict = data_dict[sub_reddit_name]
-        source_count, non_source_count = 0, 0
-        source_engagement_count, non_source_engagement_count = 0, 0
-
-        for time_key in sub_reddit_dict.keys():
-            for post_id in sub_reddit_dict[time_key]:
-                post = sub_reddit_dict[time_key][post_id]
-
-                if post.title not in tracker.keys():
-                    tracker[post.title] = 1
-
-                    if engagement_type == "score":
-                        if post.relevant:
-                            if len(post.sources) > 0 or sub_reddit_name == "WorldNews":
-                                source_count += 1
-                                source_engagement_count += int(post.num_comm)
-                            else:
-                                non_source_count += 1
-                                non_source_engagement_count += int(post.num_comm)
-                    else:
-                        if post.relevant:
-                            if len(post.sources) > 0 or sub_reddit_name == "WorldNews":
-                                source_count += 1
-                                source_engagement_count += int(post.num_comm)
-                            else:
-                                non_source_count += 1
-                                non_source_engagement_count += int(post.num_comm)
-
-        if sub_reddit_name == "Coronavirus":
-            source_engagement_values[0] = source_engagement_count / source_count
-            non_source_engagement_values[0] = non_source_engagement_count / non_source_count
-        elif sub_reddit_name == "News":
-            source_engagement_values[1] = source_engagement_count / source_count
-            non_source_engagement_values[1] = non_source_engagement_count / non_source_count
-        elif sub_reddit_name == "Science":
-            source_engagement_values[2] = source_engagement_count / source_count
-            non_source_engagement_values[2] = non_source_engagement_count / non_source_count
-        else:  # Every post in r/WorldNews has a link
-            source_engagement_values[3] = source_engagement_count / source_count
-            non_source_engagement_values[3] = 0
-
-        tracker.clear()
-
-    labels = ["Coronavirus", "News", "Science", "WorldNews"]
+    labels = [subreddit.label for subreddit in subreddits]
 
     if engagement_type == "score":
         fig = go.Figure(data=[
@@ -366,7 +410,7 @@ def graph_covid_source_engagement(data_dict, engagement_type):
         ])
 
         fig.update_layout(
-            title="Average Upvotes for Covid Related Posts With and Without Provided Sources - All SubReddits, All Time Filters",
+            title="Average Upvotes for Covid Related Posts With and Without Provided Sources - All SubReddits, " + time_filters_title(time_filters),
             xaxis_title="Subreddit",
             yaxis_title="Score",
             font=dict(size=20)
@@ -378,7 +422,7 @@ def graph_covid_source_engagement(data_dict, engagement_type):
         ])
 
         fig.update_layout(
-            title="Average Number of Comments for Covid Related Posts With and Without Provided Sources - All SubReddits, All Time Filters",
+            title="Average Number of Comments for Covid Related Posts With and Without Provided Sources - All SubReddits, " + time_filters_title(time_filters),
             xaxis_title="Subreddit",
             yaxis_title="Comments",
             font=dict(size=20)
@@ -387,150 +431,66 @@ def graph_covid_source_engagement(data_dict, engagement_type):
     fig.update_xaxes(showgrid=True, gridcolor="rgb(140,140,140)")
     fig.update_yaxes(showgrid=True, gridcolor="rgb(140,140,140)")
 
-    fig.show()
+    if show:
+        show_figure(fig)
+    return fig
+
+
+#   Graphs a Histogram of the average engagement (upvotes or comments) of the covid posts citing each of the websites
+#   covid posts cite the most, in every subreddit, from the index of the sources of the table.  Every post is counted
+#   once, even when it is in the listings of several time filters.
+#   Returns the figure, which is only opened in the browser if show is True
+#   time_filters: the time filters the table was loaded with, named in the title
+
+@timed()
+def graph_top_source_domains(post_table, engagement_type, show=True, time_filters=None, n=10):
+    import plotly.graph_objects as go
+    column = engagement_column(engagement_type)
+    domains = post_table.top_domains(n, relevant=True)
+    labels = [domain + " (" + str(posts) + " posts)" for domain, posts in domains]
+    values = [post_table.domain_mean(domain, column, relevant=True) for domain, posts in domains]
+
+    if engagement_type == "score":
+        fig = go.Figure(data=[go.Bar(name="Average Score", x=labels, y=values)])
+        fig.update_layout(
+            title="Average Upvotes for Covid Related Posts by the Websites They Cite the Most - All SubReddits, " + time_filters_title(time_filters),
+            xaxis_title="Website",
+            yaxis_title="Score",
+            font=dict(size=20)
+        )
+    else:
+        fig = go.Figure(data=[go.Bar(name="Average Number of Comments", x=labels, y=values)])
+        fig.update_layout(
+            title="Average Number of Comments for Covid Related Posts by the Websites They Cite the Most - All SubReddits, " + time_filters_title(time_filters),
+            xaxis_title="Website",
+            yaxis_title="Comments",
+            font=dict(size=20)
+        )
+
+    fig.update_xaxes(showgrid=True, gridcolor="rgb(140,140,140)")
+    fig.update_yaxes(showgrid=True, gridcolor="rgb(140,140,140)")
+
+    if show:
+        show_figure(fig)
+    return fig
 
 
 #   Graphs a time series visualization of the average engagement (upvotes or comments) change through each day of the week.
 #   Graphs both average engagement for covid vs non-covid posts.
+#   Every post is counted once, even when it is in the listings of several time filters.
+#   Returns the figure, which is only opened in the browser if show is True
+#   time_filters: the time filters the table was loaded with, named in the title
 
 
-def graph_time_series_engagement_daily(sub_reddit_name, sub_reddit_dict, engagement_type):
-    tracker = dict()
-
+@timed()
+def graph_time_series_engagement_daily(sub_reddit_name, post_table, engagement_type, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    name = REGISTRY.get(sub_reddit_name).name
     week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    week_covid_engagement_values = [0, 0, 0, 0, 0, 0, 0]
-    week_covid_post_count = [0, 0, 0, 0, 0, 0, 0]
-    week_non_covid_engagement_values = [0, 0, 0, 0, 0, 0, 0]
-    week_non_covid_post_count = [0, 0, 0, 0, 0, 0, 0]
-
-    for time_key in sub_reddit_dict.keys():
-        for post_id in sub_reddit_dict[time_key].keys():
-            post = sub_reddit_dict[time_key][post_id]
-
-            if post.title not in tracker.keys():
-                tracker[post.title] = 1
-
-                date_data = post.created.strip().split(" ")[0].split("-")
-                date = datetime.datetime(int(date_data[0]), int(date_data[1]), int(date_data[2]))
-                day_of_week = date.strftime("%A")
-
-                if day_of_week == "Monday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[0] += int(post.score)
-                            week_covid_post_count[0] += 1
-                        else:
-                            week_covid_engagement_values[0] += int(post.num_comm)
-                            week_covid_post_count[0] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[0] += int(post.score)
-                            week_non_covid_post_count[0] += 1
-                        else:
-                            week_non_covid_engagement_values[0] += int(post.num_comm)
-                            week_non_covid_post_count[0] += 1
-                elif day_of_week == "Tuesday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[1] += int(post.score)
-                            week_covid_post_count[1] += 1
-                        else:
-                            week_covid_engagement_values[1] += int(post.num_comm)
-                            week_covid_post_count[1] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[1] += int(post.score)
-                            week_non_covid_post_count[1] += 1
-                        else:
-                            week_non_covid_engagement_values[1] += int(post.num_comm)
-                            week_non_covid_post_count[1] += 1
-                elif day_of_week == "Wednesday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[2] += int(post.score)
-                            week_covid_post_count[2] += 1
-                        else:
-                            week_covid_engagement_values[2] += int(post.num_comm)
-                            week_covid_post_count[2] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[2] += int(post.score)
-                            week_non_covid_post_count[2] += 1
-                        else:
-                            week_non_covid_engagement_values[2] += int(post.num_comm)
-                            week_non_covid_post_count[2] += 1
-                elif day_of_week == "Thursday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[3] += int(post.score)
-                            week_covid_post_count[3] += 1
-                        else:
-                            week_covid_engagement_values[3] += int(post.num_comm)
-                            week_covid_post_count[3] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[3] += int(post.score)
-                            week_non_covid_post_count[3] += 1
-                        else:
-                            week_non_covid_engagement_values[3] += int(post.num_comm)
-                            week_non_covid_post_count[3] += 1
-                elif day_of_week == "Friday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[4] += int(post.score)
-                            week_covid_post_count[4] += 1
-                        else:
-                            week_covid_engagement_values[4] += int(post.num_comm)
-                            week_covid_post_count[4] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[4] += int(post.score)
-                            week_non_covid_post_count[4] += 1
-                        else:
-                            week_non_covid_engagement_values[4] += int(post.num_comm)
-                            week_non_covid_post_count[4] += 1
-                elif day_of_week == "Saturday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[5] += int(post.score)
-                            week_covid_post_count[5] += 1
-                        else:
-                            week_covid_engagement_values[5] += int(post.num_comm)
-                            week_covid_post_count[5] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[5] += int(post.score)
-                            week_non_covid_post_count[5] += 1
-                        else:
-                            week_non_covid_engagement_values[5] += int(post.num_comm)
-                            week_non_covid_post_count[5] += 1
-                elif day_of_week == "Sunday":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            week_covid_engagement_values[6] += int(post.score)
-                            week_covid_post_count[6] += 1
-                        else:
-                            week_covid_engagement_values[6] += int(post.num_comm)
-                            week_covid_post_count[6] += 1
-                    else:
-                        if engagement_type == "score":
-                            week_non_covid_engagement_values[6] += int(post.score)
-                            week_non_covid_post_count[6] += 1
-                        else:
-                            week_non_covid_engagement_values[6] += int(post.num_comm)
-                            week_non_covid_post_count[6] += 1
-        tracker.clear()
-
-    week_covid_engagement = list()
-    week_non_covid_engagement = list()
-    fig = None
-
-    for i in range(7):
-        week_covid_engagement.append(week_covid_engagement_values[i] / week_covid_post_count[i])
-        if sub_reddit_name == "Coronavirus":
-            week_non_covid_engagement.append(0)
-        else:
-            week_non_covid_engagement.append(week_non_covid_engagement_values[i] / week_non_covid_post_count[i])
+    means = post_table.aggregate(["relevant", "weekday"], engagement_column(engagement_type),
+                                 subreddit=name)["mean"]
+    week_covid_engagement = series(means, [(1, i) for i in range(7)])
+    week_non_covid_engagement = series(means, [(0, i) for i in range(7)])
 
     if engagement_type == "score":
         fig = go.Figure(data=[
@@ -538,7 +498,7 @@ def graph_time_series_engagement_daily(sub_reddit_name, sub_reddit_dict, engagem
                         go.Scatter(x=week, y=week_non_covid_engagement, name="Average Upvotes on Non-Covid Related Posts")])
 
         fig.update_layout(
-            title="Daily Average Score for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", All Time Filters",
+            title="Daily Average Score for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", " + time_filters_title(time_filters),
             xaxis_title="Day of Week",
             yaxis_title="Score",
             font=dict(size=20)
@@ -549,7 +509,7 @@ def graph_time_series_engagement_daily(sub_reddit_name, sub_reddit_dict, engagem
             go.Scatter(x=week, y=week_non_covid_engagement, name="Average Number of Comments on Non-Covid Related Posts")])
 
         fig.update_layout(
-            title="Daily Average Number of Comments for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", All Time Filters",
+            title="Daily Average Number of Comments for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", " + time_filters_title(time_filters),
             xaxis_title="Day of Week",
             yaxis_title="Comments",
             font=dict(size=20)
@@ -558,241 +518,29 @@ def graph_time_series_engagement_daily(sub_reddit_name, sub_reddit_dict, engagem
     fig.update_xaxes(showgrid=True, gridcolor="rgb(140,140,140)")
     fig.update_yaxes(showgrid=True, gridcolor="rgb(140,140,140)")
 
-    fig.show()
+    if show:
+        show_figure(fig)
+    return fig
 
 
 #   Graphs a time series visualization of the average engagement(upvotes or comments) change through each month of the year.
 #   Graphs both average engagement for covid vs non-covid posts.
+#   Every post is counted once, even when it is in the listings of several time filters.
+#   Returns the figure, which is only opened in the browser if show is True
+#   time_filters: the time filters the table was loaded with, named in the title
 
 
-def graph_time_series_engagement_monthly(sub_reddit_name, sub_reddit_dict, engagement_type):
-    tracker = dict()
-
+@timed()
+def graph_time_series_engagement_monthly(sub_reddit_name, post_table, engagement_type, show=True, time_filters=None):
+    import plotly.graph_objects as go
+    name = REGISTRY.get(sub_reddit_name).name
     year = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-    year_covid_engagement_values = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    year_covid_post_count = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    year_non_covid_engagement_values = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    year_non_covid_post_count = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-
-    for time_key in sub_reddit_dict.keys():
-        for post_id in sub_reddit_dict[time_key].keys():
-            post = sub_reddit_dict[time_key][post_id]
-
-            if post.title not in tracker.keys():
-                tracker[post.title] = 1
-
-                date_data = post.created.strip().split(" ")[0].split("-")
-                date = datetime.datetime(int(date_data[0]), int(date_data[1]), int(date_data[2]))
-                month = date.strftime("%B").strip()
-
-                if post.relevant:
-                    if month == "November" or month == "December":
-                        print(str(date_data) + " --> " + str(post.score) + " --> " + post.title)
-
-                if month == "January":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[0] += int(post.score)
-                            year_covid_post_count[0] += 1
-                        else:
-                            year_covid_engagement_values[0] += int(post.num_comm)
-                            year_covid_post_count[0] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[0] += int(post.score)
-                            year_non_covid_post_count[0] += 1
-                        else:
-                            year_non_covid_engagement_values[0] += int(post.num_comm)
-                            year_non_covid_post_count[0] += 1
-                elif month == "February":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[1] += int(post.score)
-                            year_covid_post_count[1] += 1
-                        else:
-                            year_covid_engagement_values[1] += int(post.num_comm)
-                            year_covid_post_count[1] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[1] += int(post.score)
-                            year_non_covid_post_count[1] += 1
-                        else:
-                            year_non_covid_engagement_values[1] += int(post.num_comm)
-                            year_non_covid_post_count[1] += 1
-                elif month == "March":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[2] += int(post.score)
-                            year_covid_post_count[2] += 1
-                        else:
-                            year_covid_engagement_values[2] += int(post.num_comm)
-                            year_covid_post_count[2] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[2] += int(post.score)
-                            year_non_covid_post_count[2] += 1
-                        else:
-                            year_non_covid_engagement_values[2] += int(post.num_comm)
-                            year_non_covid_post_count[2] += 1
-                elif month == "April":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[3] += int(post.score)
-                            year_covid_post_count[3] += 1
-                        else:
-                            year_covid_engagement_values[3] += int(post.num_comm)
-                            year_covid_post_count[3] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[3] += int(post.score)
-                            year_non_covid_post_count[3] += 1
-                        else:
-                            year_non_covid_engagement_values[3] += int(post.num_comm)
-                            year_non_covid_post_count[3] += 1
-                elif month == "May":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[4] += int(post.score)
-                            year_covid_post_count[4] += 1
-                        else:
-                            year_covid_engagement_values[4] += int(post.num_comm)
-                            year_covid_post_count[4] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[4] += int(post.score)
-                            year_non_covid_post_count[4] += 1
-                        else:
-                            year_non_covid_engagement_values[4] += int(post.num_comm)
-                            year_non_covid_post_count[4] += 1
-                elif month == "June":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[5] += int(post.score)
-                            year_covid_post_count[5] += 1
-                        else:
-                            year_covid_engagement_values[5] += int(post.num_comm)
-                            year_covid_post_count[5] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[5] += int(post.score)
-                            year_non_covid_post_count[5] += 1
-                        else:
-                            year_non_covid_engagement_values[5] += int(post.num_comm)
-                            year_non_covid_post_count[5] += 1
-                elif month == "July":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[6] += int(post.score)
-                            year_covid_post_count[6] += 1
-                        else:
-                            year_covid_engagement_values[6] += int(post.num_comm)
-                            year_covid_post_count[6] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[6] += int(post.score)
-                            year_non_covid_post_count[6] += 1
-                        else:
-                            year_non_covid_engagement_values[6] += int(post.num_comm)
-                            year_non_covid_post_count[6] += 1
-                elif month == "August":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[7] += int(post.score)
-                            year_covid_post_count[7] += 1
-                        else:
-                            year_covid_engagement_values[7] += int(post.num_comm)
-                            year_covid_post_count[7] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[7] += int(post.score)
-                            year_non_covid_post_count[7] += 1
-                        else:
-                            year_non_covid_engagement_values[7] += int(post.num_comm)
-                            year_non_covid_post_count[7] += 1
-                elif month == "September":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[8] += int(post.score)
-                            year_covid_post_count[8] += 1
-                        else:
-                            year_covid_engagement_values[8] += int(post.num_comm)
-                            year_covid_post_count[8] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[8] += int(post.score)
-                            year_non_covid_post_count[8] += 1
-                        else:
-                            year_non_covid_engagement_values[8] += int(post.num_comm)
-                            year_non_covid_post_count[8] += 1
-                elif month == "October":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[9] += int(post.score)
-                            year_covid_post_count[9] += 1
-                        else:
-                            year_covid_engagement_values[9] += int(post.num_comm)
-                            year_covid_post_count[9] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[9] += int(post.score)
-                            year_non_covid_post_count[9] += 1
-                        else:
-                            year_non_covid_engagement_values[9] += int(post.num_comm)
-                            year_non_covid_post_count[9] += 1
-                elif month == "November":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[10] += int(post.score)
-                            year_covid_post_count[10] += 1
-                        else:
-                            year_covid_engagement_values[10] += int(post.num_comm)
-                            year_covid_post_count[10] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[10] += int(post.score)
-                            year_non_covid_post_count[10] += 1
-                        else:
-                            year_non_covid_engagement_values[10] += int(post.num_comm)
-                            year_non_covid_post_count[10] += 1
-                elif month == "December":
-                    if post.relevant:
-                        if engagement_type == "score":
-                            year_covid_engagement_values[11] += int(post.score)
-                            year_covid_post_count[11] += 1
-                        else:
-                            year_covid_engagement_values[11] += int(post.num_comm)
-                            year_covid_post_count[11] += 1
-                    else:
-                        if engagement_type == "score":
-                            year_non_covid_engagement_values[11] += int(post.score)
-                            year_non_covid_post_count[11] += 1
-                        else:
-                            year_non_covid_engagement_values[11] += int(post.num_comm)
-                            year_non_covid_post_count[11] += 1
-
-    year_covid_engagement = list()
-    year_non_covid_engagement = list()
-    fig = None
 
     # Calculate the mean of each month
-    for i in range(12):
-        if year_covid_post_count[i] == 0 or year_non_covid_post_count[i] == 0:
-            if year_covid_post_count[i] == 0:
-                year_covid_engagement.append(0)
-                if sub_reddit_name == "Coronavirus":
-                    year_non_covid_engagement.append(0)
-                else:
-                    year_non_covid_engagement.append(year_non_covid_engagement_values[i] / year_non_covid_post_count[i])
-            else:
-                year_non_covid_engagement.append(0)
-                year_covid_engagement.append(year_covid_engagement_values[i] / year_covid_post_count[i])
-
-        else:
-            year_covid_engagement.append(year_covid_engagement_values[i] / year_covid_post_count[i])
-            if sub_reddit_name == "Coronavirus":
-                year_non_covid_engagement.append(0)
-            else:
-                year_non_covid_engagement.append(year_non_covid_engagement_values[i] / year_non_covid_post_count[i])
+    means = post_table.aggregate(["relevant", "month"], engagement_column(engagement_type),
+                                 subreddit=name)["mean"]
+    year_covid_engagement = series(means, [(1, i + 1) for i in range(12)])
+    year_non_covid_engagement = series(means, [(0, i + 1) for i in range(12)])
 
     if engagement_type == "score":
         fig = go.Figure(data=[
@@ -800,7 +548,7 @@ def graph_time_series_engagement_monthly(sub_reddit_name, sub_reddit_dict, engag
                         go.Scatter(x=year, y=year_non_covid_engagement, name="Average Upvotes on Non-Covid Related Posts")])
 
         fig.update_layout(
-            title="Monthly Average Score for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", All Time Filters",
+            title="Monthly Average Score for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", " + time_filters_title(time_filters),
             xaxis_title="Month",
             yaxis_title="Score",
             font=dict(size=20)
@@ -811,7 +559,7 @@ def graph_time_series_engagement_monthly(sub_reddit_name, sub_reddit_dict, engag
             go.Scatter(x=year, y=year_non_covid_engagement, name="Average Number of Comments on Non-Covid Related Posts")])
 
         fig.update_layout(
-            title="Monthly Average Number of Comments for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", All Time Filters",
+            title="Monthly Average Number of Comments for Covid Related or Non-Covid Related Posts - " + sub_reddit_name + ", " + time_filters_title(time_filters),
             xaxis_title="Month",
             yaxis_title="Comments",
             font=dict(size=20)
@@ -820,48 +568,132 @@ def graph_time_series_engagement_monthly(sub_reddit_name, sub_reddit_dict, engag
     fig.update_xaxes(showgrid=True, gridcolor="rgb(140,140,140)")
     fig.update_yaxes(showgrid=True, gridcolor="rgb(140,140,140)")
 
-    fig.show()
+    if show:
+        show_figure(fig)
+    return fig
 
 
 #   Gets user input for which subreddit to generate a graph on.
 
 def choose_subreddit():
-    print("\nWhich SubReddit?\n"
-          "\t1. Coronavirus\n"
-          "\t2. News\n"
-          "\t3. Science\n"
-          "\t4. WorldNews")
+    labels = REGISTRY.labels()
+    print("\nWhich SubReddit?\n" +
+          "\n".join("\t" + str(i + 1) + ". " + label for i, label in enumerate(labels)))
 
     input1 = input("Enter numeric choice: ")
 
-    if input1 == "1":
-        sub_reddit_name = "Coronavirus"
-    elif input1 == "2":
-        sub_reddit_name = "News"
-    elif input1 == "3":
-        sub_reddit_name = "Science"
+    # Anything else picks the last one
+    if input1.isdigit() and 1 <= int(input1) <= len(labels):
+        sub_reddit_name = labels[int(input1) - 1]
     else:
-        sub_reddit_name = "WorldNews"
+        sub_reddit_name = labels[-1]
 
     return sub_reddit_name
 
 
-def main():
-    coronavirus_dict = dict()
-    news_dict = dict()
-    science_dict = dict()
-    worldnews_dict = dict()
+# Charts that can be made from the command line: (graph function, if it graphs a single subreddit, if it makes a
+# figure for every time filter, help)
+CHARTS = {
+    "post-count": (graph_covid_post_count, True, True, "Pie chart of COVID related posts"),
+    "sources": (graph_sources_in_covid_posts, True, True, "Pie chart of COVID related posts with sources"),
+    "engagement": (graph_covid_engagement, False, False,
+                   "Histogram of the engagement of COVID related vs other posts in every subreddit"),
+    "source-engagement": (graph_covid_source_engagement, False, False,
+                          "Histogram of the engagement of COVID related posts with vs without sources"),
+    "domains": (graph_top_source_domains, False, False,
+                "Histogram of the engagement of COVID related posts by the websites they cite the most"),
+    "daily": (graph_time_series_engagement_daily, True, False, "Time series of the engagement by day of the week"),
+    "monthly": (graph_time_series_engagement_monthly, True, False, "Time series of the engagement by month"),
+}
+
+
+# Saves a figure to a file, an .html file or an image like .png (which needs the kaleido package).  .html files load
+# plotly.js from a plotly.min.js next to them, so many charts in one folder share it.
+
+def write_figure(fig, path):
+    if path.endswith(".html"):
+        fig.write_html(path, include_plotlyjs="directory")
+    else:
+        fig.write_image(path)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Graphs data that was gathered from Reddit.  Run without arguments "
+                                                 "to pick a chart from a menu.")
+    parser.add_argument("--metrics", metavar="PATH", help="append the time, rows and memory of every stage to this "
+                                                           "file as JSON lines, - for stderr")
+    parser.add_argument("--summary", action="store_true", help="print a table of the time every stage took")
+    parser.add_argument("--data-dir", help="folder with the updated/ .tsv files, " + snapshot.DATA_DIR +
+                                           " by default")
+    parser.add_argument("--db", help="query this SQLite database made by sqlite_store.py instead of loading the files")
+    charts = parser.add_subparsers(dest="chart", required=True, metavar="chart")
+    labels = REGISTRY.labels()
+
+    for chart, (function, single_subreddit, by_time_filter, help_text) in CHARTS.items():
+        chart_parser = charts.add_parser(chart, help=help_text, description=help_text)
+        if single_subreddit:
+            chart_parser.add_argument("--subreddit", required=True, type=lambda name: REGISTRY.get(name).label,
+                                      choices=labels)
+        if not by_time_filter:
+            chart_parser.add_argument("--metric", choices=["score", "comments"], default="score")
+        chart_parser.add_argument("--time-filter", dest="time_filters", action="append", choices=REGISTRY.time_filters,
+                                  help="only graph the posts of this time filter, can be given more than once")
+        chart_parser.add_argument("--output", help="file to save the chart to instead of showing it, ex. chart.html "
+                                                   "or chart.png.  Pie charts save one file per time filter, "
+                                                   "ex. chart_day.html")
+
+    return parser.parse_args(argv)
+
+
+# Makes the chart asked for on the command line.  Only the .tsv files of the chosen subreddit and time filters are
+# loaded, or with --db the chart is queried from the database.  Returns the paths of the files written.
+
+def run_chart(args):
+    function, single_subreddit, by_time_filter = CHARTS[args.chart][:3]
+    sub_reddit_names = [REGISTRY.get(args.subreddit).name] if single_subreddit else REGISTRY.names()
+    if args.db is not None:
+        post_table = SqliteStore(connect(args.db), args.time_filters)
+    else:
+        post_table = load_data(sub_reddit_names, time_filters=args.time_filters)
+    show = args.output is None
 
-    parse_data("coronavirus", coronavirus_dict)
-    parse_data("news", news_dict)
-    parse_data("science", science_dict)
-    parse_data("worldnews", worldnews_dict)
+    if by_time_filter:
+        figures = function(args.subreddit, post_table, show, args.time_filters)
+    elif single_subreddit:
+        figures = [function(args.subreddit, post_table, args.metric, show, args.time_filters)]
+    else:
+        figures = [function(post_table, args.metric, show, args.time_filters)]
 
-    data_dict = dict()
-    data_dict["Coronavirus"] = coronavirus_dict
-    data_dict["News"] = news_dict
-    data_dict["Science"] = science_dict
-    data_dict["WorldNews"] = worldnews_dict
+    paths = list()
+    if args.output is not None:
+        if len(figures) == 1:
+            paths.append(args.output)
+        else:
+            base, extension = os.path.splitext(args.output)
+            paths.extend(base + "_" + time_key + extension for time_key in args.time_filters or REGISTRY.time_filters)
+        for fig, path in zip(figures, paths):
+            write_figure(fig, path)
+    return paths
+
+
+# Makes one chart from the command line arguments if there are any, ex.
+#   python graph_data.py daily --subreddit News --metric comments --output daily.html
+# otherwise asks which chart to make.  Only the data the chosen chart needs is loaded.
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) > 0:
+        args = parse_args(argv)
+        if args.data_dir is not None:
+            snapshot.DATA_DIR = args.data_dir
+        if args.metrics is not None or args.summary:
+            instrument.enable(args.metrics)
+        for path in run_chart(args):
+            print("Wrote " + path)
+        if args.summary:
+            print(instrument.summary())
+        return
 
     print("Pick one of the following visualizations to generate:")
     print("\t1. Pie Chart\n"
@@ -877,42 +709,35 @@ def main():
 
         if input1 == "1":  # Chose number of COVID related posts
             sub_reddit_name = choose_subreddit()
-            if sub_reddit_name == "Coronavirus":
-                graph_covid_post_count(sub_reddit_name, coronavirus_dict)
-            elif sub_reddit_name == "News":
-                graph_covid_post_count(sub_reddit_name, news_dict)
-            elif sub_reddit_name == "Science":
-                graph_covid_post_count(sub_reddit_name, science_dict)
-            elif sub_reddit_name == "WorldNews":
-                graph_covid_post_count(sub_reddit_name, worldnews_dict)
+            graph_covid_post_count(sub_reddit_name, load_data([REGISTRY.get(sub_reddit_name).name]))
 
         elif input1 == "2":  # Chose number of sources provided in covid related posts
             sub_reddit_name = choose_subreddit()
-            if sub_reddit_name == "Coronavirus":
-                graph_sources_in_covid_posts(sub_reddit_name, coronavirus_dict)
-            elif sub_reddit_name == "News":
-                graph_sources_in_covid_posts(sub_reddit_name, news_dict)
-            elif sub_reddit_name == "Science":
-                graph_sources_in_covid_posts(sub_reddit_name, science_dict)
-            elif sub_reddit_name == "WorldNews":
-                graph_sources_in_covid_posts(sub_reddit_name, worldnews_dict)
+            graph_sources_in_covid_posts(sub_reddit_name, load_data([REGISTRY.get(sub_reddit_name).name]))
 
     elif input1 == "2":
         print("\nPick one of the following histograms to visualize:\n"
               "\t1. Average Upvotes in Covid Related Posts vs Non-Covid Related Posts\n"
               "\t2. Average Upvotes in Covid Related Posts with/without sources.\n"
               "\t3. Average Number of Comments in Covid Related Posts vs Non-Covid Related Posts\n"
-              "\t4. Average Number of Comments in Covid Related Posts with/without sources.")
+              "\t4. Average Number of Comments in Covid Related Posts with/without sources.\n"
+              "\t5. Average Upvotes in Covid Related Posts by the websites they cite the most.\n"
+              "\t6. Average Number of Comments in Covid Related Posts by the websites they cite the most.")
         input1 = input("Enter numeric choice: ")
+        post_table = load_data(REGISTRY.names())
 
         if input1 == "1":
-            graph_covid_engagement(data_dict, "score")
+            graph_covid_engagement(post_table, "score")
         elif input1 == "2":
-            graph_covid_source_engagement(data_dict, "score")
+            graph_covid_source_engagement(post_table, "score")
         elif input1 == "3":
-            graph_covid_engagement(data_dict, "comments")
+            graph_covid_engagement(post_table, "comments")
         elif input1 == "4":
-            graph_covid_source_engagement(data_dict, "comments")
+            graph_covid_source_engagement(post_table, "comments")
+        elif input1 == "5":
+            graph_top_source_domains(post_table, "score")
+        elif input1 == "6":
+            graph_top_source_domains(post_table, "comments")
     elif input1 == "3":
         print("\nPick one of the following time series to visualize:\n"
               "\t1. Average Daily Upvotes in Covid Related Posts\n"
@@ -921,96 +746,16 @@ def main():
               "\t4. Average Montly Number of Comments in Covid Related Posts")
         input1 = input("Enter numeric choice: ")
         sub_reddit_name = choose_subreddit()
+        post_table = load_data([REGISTRY.get(sub_reddit_name).name])
 
         if input1 == "1":
-            if sub_reddit_name == "Coronavirus":
-                graph_time_series_engagement_daily(sub_reddit_name, coronavirus_dict, "score")
-            elif sub_reddit_name == "News":
-                graph_time_series_engagement_daily(sub_reddit_name, news_dict, "score")
-            elif sub_reddit_name == "Science":
-                graph_time_series_engagement_daily(sub_reddit_name, science_dict, "score")
-            elif sub_reddit_name == "WorldNews":
-                graph_time_series_engagement_daily(sub_reddit_name, worldnews_dict, "score")
+            graph_time_series_engagement_daily(sub_reddit_name, post_table, "score")
         if input1 == "2":
-            if sub_reddit_name == "Coronavirus":
-                graph_time_series_engagement_daily(sub_reddit_name, coronavirus_dict, "comments")
-            elif sub_reddit_name == "News":
-                graph_time_series_engagement_daily(sub_reddit_name, news_dict, "comments")
-            elif sub_reddit_name == "Science":
-                graph_time_series_engagement_daily(sub_reddit_name, science_dict, "comments")
-            elif sub_reddit_name == "WorldNews":
-                graph_time_series_engagement_daily(sub_reddit_name, worldnews_dict, "comments")
+            graph_time_series_engagement_daily(sub_reddit_name, post_table, "comments")
         if input1 == "3":
-            if sub_reddit_name == "Coronavirus":
-                graph_time_series_engagement_monthly(sub_reddit_name, coronavirus_dict, "score")
-            elif sub_reddit_name == "News":
-                graph_time_series_engagement_monthly(sub_reddit_name, news_dict, "score")
-            elif sub_reddit_name == "Science":
-                graph_time_series_engagement_monthly(sub_reddit_name, science_dict, "score")
-            elif sub_reddit_name == "WorldNews":
-                graph_time_series_engagement_monthly(sub_reddit_name, worldnews_dict, "score")
+            graph_time_series_engagement_monthly(sub_reddit_name, post_table, "score")
         if input1 == "4":
-            if sub_reddit_name == "Coronavirus":
-                graph_time_series_engagement_monthly(sub_reddit_name, coronavirus_dict, "comments")
-            elif sub_reddit_name == "News":
-                graph_time_series_engagement_monthly(sub_reddit_name, news_dict, "comments")
-            elif sub_reddit_name == "Science":
-                graph_time_series_engagement_monthly(sub_reddit_name, science_dict, "comments")
-            elif sub_reddit_name == "WorldNews":
-                graph_time_series_engagement_monthly(sub_reddit_name, worldnews_dict, "comments")
-
-    # UNCOMMENT THIS CODE TO REWRITE THE DATA_DICTIONARY.TXT FILE AGAIN
-    # file = open("data/data_dictionary.txt", mode="w", encoding="utf8")
-    #
-    # file.write(
-    #     "========================================== r/Coronavirus Data ==========================================\n")
-    # for dict_name in coronavirus_dict.keys():
-    #     file.write("Sorted by: " + dict_name)
-    #     for key in sorted(coronavirus_dict[dict_name].keys()):
-    #         file.write("\n\t\t\tTitle: " + coronavirus_dict[dict_name][key].title +
-    #                    "\n\t\t\tScore: " + str(coronavirus_dict[dict_name][key].score) +
-    #                    "\n\t\t\tNumber of Comments: " + str(coronavirus_dict[dict_name][key].num_comm) +
-    #                    "\n\t\t\tDate Created: " + coronavirus_dict[dict_name][key].created +
-    #                    "\n\t\t\tPost Content: " + coronavirus_dict[dict_name][key].content +
-    #                    "\n\t\t\tCOVID Related?: " + str(coronavirus_dict[dict_name][key].relevant) +
-    #                    "\n\t\t\tSources: " + str(coronavirus_dict[dict_name][key].sources) + "\n")
-    #
-    # file.write("========================================== r/News Data ==========================================\n")
-    # for dict_name in news_dict.keys():
-    #     file.write("Sorted by: " + dict_name)
-    #     for key in sorted(news_dict[dict_name].keys()):
-    #         file.write("\n\t\t\tTitle: " + news_dict[dict_name][key].title +
-    #                    "\n\t\t\tScore: " + str(news_dict[dict_name][key].score) +
-    #                    "\n\t\t\tNumber of Comments: " + str(news_dict[dict_name][key].num_comm) +
-    #                    "\n\t\t\tDate Created: " + news_dict[dict_name][key].created +
-    #                    "\n\t\t\tPost Content: " + news_dict[dict_name][key].content +
-    #                    "\n\t\t\tCOVID Related?: " + str(news_dict[dict_name][key].relevant) +
-    #                    "\n\t\t\tSource: " + str(news_dict[dict_name][key].sources) + "\n")
-    #
-    # file.write("========================================== r/Science Data ==========================================\n")
-    # for dict_name in science_dict.keys():
-    #     file.write("Sorted by: " + dict_name)
-    #     for key in sorted(science_dict[dict_name].keys()):
-    #         file.write("\n\t\t\tTitle: " + science_dict[dict_name][key].title +
-    #                    "\n\t\t\tScore: " + str(science_dict[dict_name][key].score) +
-    #                    "\n\t\t\tNumber of Comments: " + str(science_dict[dict_name][key].num_comm) +
-    #                    "\n\t\t\tDate Created: " + science_dict[dict_name][key].created +
-    #                    "\n\t\t\tPost Content: " + science_dict[dict_name][key].content +
-    #                    "\n\t\t\tCOVID Related?: " + str(science_dict[dict_name][key].relevant) +
-    #                    "\n\t\t\tSource: " + str(science_dict[dict_name][key].sources) + "\n")
-    #
-    # file.write(
-    #     "========================================== r/WorldNews Data ==========================================\n")
-    # for dict_name in worldnews_dict.keys():
-    #     file.write("Sorted by: " + dict_name)
-    #     for key in sorted(worldnews_dict[dict_name].keys()):
-    #         file.write("\n\t\t\tTitle: " + worldnews_dict[dict_name][key].title +
-    #                    "\n\t\t\tScore: " + str(worldnews_dict[dict_name][key].score) +
-    #                    "\n\t\t\tNumber of Comments: " + str(worldnews_dict[dict_name][key].num_comm) +
-    #                    "\n\t\t\tDate Created: " + worldnews_dict[dict_name][key].created +
-    #                    "\n\t\t\tPost Content: " + worldnews_dict[dict_name][key].content +
-    #                    "\n\t\t\tCOVID Related?: " + str(worldnews_dict[dict_name][key].relevant) +
-    #                    "\n\t\t\tSource: " + str(worldnews_dict[dict_name][key].sources) + "\n")
+            graph_time_series_engagement_monthly(sub_reddit_name, post_table, "comments")
 
 
 if __name__ == '__main__':
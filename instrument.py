@@ -0,0 +1,142 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Times the stages of scraping, enriching, loading and graphing.  Every stage records its wall time, rows,
+    bytes read, rows per second and the peak memory of the process, written as JSON lines and/or printed as a summary.
+    Turned on with enable(), or for every process by setting REDDIT_METRICS to a file (or - for stderr).
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Not on Windows, where peak memory is left out
+except ImportError:
+    resource = None
+
+
+# Setting this to a file turns on metrics in every process, including the workers of process pools
+ENV_VAR = "REDDIT_METRICS"
+
+_lock = threading.Lock()
+_records = list()
+_settings = {"enabled": os.environ.get(ENV_VAR) is not None, "output": os.environ.get(ENV_VAR)}
+
+
+# Turns on metrics.  output is a file that every stage is appended to as a JSON line, "-" for stderr, or None to only
+# keep them for summary().
+def enable(output=None):
+    _settings["enabled"] = True
+    _settings["output"] = output
+    if output is not None:
+        os.environ[ENV_VAR] = output
+
+
+def disable():
+    _settings["enabled"] = False
+    _settings["output"] = None
+    os.environ.pop(ENV_VAR, None)
+
+
+def enabled():
+    return _settings["enabled"]
+
+
+# Peak resident memory of the process so far in KB, None where it can't be found
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # macOS gives bytes instead of KB
+        peak //= 1024
+    return peak
+
+
+# A running stage.  The code being timed adds to rows and bytes as it goes, other fields are written as they are.
+class Stage:
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+        self.fields = fields
+
+    def record(self, seconds):
+        record = {"stage": self.name, "seconds": round(seconds, 6), "rows": self.rows, "bytes": self.bytes,
+                  "rows_per_sec": round(self.rows / seconds, 1) if seconds > 0 else None,
+                  "peak_rss_kb": peak_rss_kb(), "pid": os.getpid(), "time": time.time()}
+        record.update(self.fields)
+        return record
+
+
+# Times the code inside the with block as a stage.  ex.
+#   with stage("parse_data", subreddit="news") as timed:
+#       timed.rows += 1
+# Does nothing but count when metrics are off.
+
+@contextmanager
+def stage(name, **fields):
+    current = Stage(name, fields)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        if _settings["enabled"]:
+            _emit(current.record(time.perf_counter() - start))
+
+
+# Decorator that times every call of a function as a stage, named after the function if no name is given
+def timed(name=None):
+    def decorator(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _settings["enabled"]:
+                return function(*args, **kwargs)
+            with stage(stage_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _emit(record):
+    line = json.dumps(record, default=str)
+    with _lock:
+        _records.append(record)
+        output = _settings["output"]
+        if output == "-":
+            print(line, file=sys.stderr)
+        elif output is not None:
+            with open(output, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+# Every stage recorded by this process
+def records():
+    with _lock:
+        return list(_records)
+
+
+# Table of the stages recorded by this process, one line for every stage name with its number of calls and totals
+def summary():
+    totals = dict()
+    for record in records():
+        total = totals.setdefault(record["stage"], {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0,
+                                                    "peak_rss_kb": 0})
+        total["calls"] += 1
+        total["seconds"] += record["seconds"]
+        total["rows"] += record["rows"]
+        total["bytes"] += record["bytes"]
+        total["peak_rss_kb"] = max(total["peak_rss_kb"], record["peak_rss_kb"] or 0)
+
+    lines = ["{:<36} {:>6} {:>10} {:>10} {:>12} {:>10} {:>12}".format(
+        "stage", "calls", "seconds", "rows", "rows/s", "MB read", "peak RSS MB")]
+    for name, total in totals.items():
+        lines.append("{:<36} {:>6} {:>10.3f} {:>10} {:>12.0f} {:>10.1f} {:>12.1f}".format(
+            name, total["calls"], total["seconds"], total["rows"], total["rows"] / max(total["seconds"], 1e-9),
+            total["bytes"] / 1e6, total["peak_rss_kb"] / 1024))
+    return "\n".join(lines)
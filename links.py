@@ -0,0 +1,41 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Finds the links in the text content of a Reddit post
+"""
+import re
+
+
+# A link is either a markdown link, [text](url), or a bare url in the text.  Urls may hold balanced parentheses,
+# ex. https://en.wikipedia.org/wiki/Coronavirus_(disambiguation).  The whole content is searched with this one
+# pattern, so the content is only scanned once no matter how many links it has.  The lookahead at the start lets
+# the regex skip straight to the characters a link can start with.
+_URL = r"[hH][tT][tT][pP][sS]?://[^\s()<>\[\]]*(?:\([^\s()<>\[\]]*\)[^\s()<>\[\]]*)*"
+_LINK = re.compile(r"(?=[\]hH])(?:\]\(\s*(" + _URL + r")|(?<![\w\[])(" + _URL + r"))")
+
+# Punctuation that ends a sentence is not part of a bare url, ex. "Read https://www.cdc.gov."
+_TRAILING = ".,;:!?'\"*"
+
+
+def _match_url(match):
+    url = match.group(1)
+    if url is None:
+        url = match.group(2).rstrip(_TRAILING)
+    return url
+
+
+# Gets every link in the text of a post, in the order they appear.  Every url has "://", and checking for it first is
+# much faster than searching with the regex, so content without any link is skipped right away.
+
+def extract_links(content):
+    if "://" not in content:
+        return list()
+    return [_match_url(match) for match in _LINK.finditer(content)]
+
+
+# Gets the links of many posts at once, ex. every post of a .tsv file.  Returns a list of links for every content,
+# in the same order.
+
+def extract_links_bulk(contents):
+    finditer = _LINK.finditer
+    return [[_match_url(match) for match in finditer(content)] if "://" in content else list()
+            for content in contents]
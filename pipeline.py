@@ -0,0 +1,125 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Scrapes posts straight into a PostTable.  Posts flow through finding sources and deciding relevance
+    one at a time, instead of being written to data/original, read back to write data/updated and read back again
+    to be graphed.  The updated .tsv, columnar file and snapshot are written on the way, so the charts load what
+    was scraped without parsing it again.
+"""
+import csv
+import os
+
+from columnar import write_columnar
+from enrich import COLUMNS as UPDATED_COLUMNS, list_post_sources
+from instrument import stage
+from post_table import PostTable
+from registry import load_registry
+from relevance import RelevanceClassifier
+from scraper import COLUMNS, iter_listing, post_row
+import snapshot
+from snapshot import save_snapshot, snapshot_settings
+
+
+# Yields the original .tsv row of every post in a top listing
+def scrape_stage(client, subreddit, time_period, limiter=None, limit=1000):
+    for post in iter_listing(client, subreddit, time_period, limiter, limit):
+        yield post_row(post)
+
+
+# Passes rows through unchanged while also writing them to a .tsv, to keep a copy of what was scraped.  The file is
+# only put in place once every row went through.
+def archive_stage(rows, file_location, columns=COLUMNS):
+    temp_location = file_location + '.tmp'
+    with open(temp_location, 'w', encoding='utf-8') as table:
+        writer = csv.writer(table, delimiter='\t')
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            yield row
+    os.replace(temp_location, file_location)
+
+
+# Turns original rows into updated rows, [title, score, num_comm, created, content, sources, id], the same way
+# list_time_frame_sources does for the updated .tsv files
+def sources_stage(rows):
+    for row in rows:
+        entry = list_post_sources([str(value) for value in row[:5]])
+        entry.append(row[COLUMNS.index('id')])
+        yield entry
+
+
+# Pairs every updated row with whether it is COVID related, the same way parse_data decides it
+def relevance_stage(entries, classifier, all_relevant=False):
+    for entry in entries:
+        content = entry[4] if entry[4] != 'None' else ''
+        yield entry, all_relevant or classifier.is_relevant(entry[0]) or classifier.is_relevant(content)
+
+
+# Adds every (updated row, relevant) pair to the table.  Line breaks are read the same way parse_data reads them
+# from the updated .tsv, see tsv_reader.decode_field.
+def load_stage(items, post_table, subreddit, time_key):
+    count = 0
+    for entry, relevant in items:
+        title = _line_breaks(entry[0])
+        content = _line_breaks(entry[4]) if entry[4] != 'None' else ''
+        sources = entry[5] if entry[5] != 'None' else list()
+        post_table.append(subreddit, time_key, title, entry[1], entry[2], entry[3], content, relevant, sources,
+                          entry[6])
+        count += 1
+    return count
+
+
+def _line_breaks(text):
+    if '\r' in text:
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+# Scrapes every time period of every subreddit into a PostTable in one pass per listing.  Returns the table.
+#   post_table: table to add to, a new one is made if None
+#   registry: rules of the subreddits, read from subreddits.json if None
+#   archive_dir: also writes what was scraped to <archive_dir>/<subreddit>_<time period>.tsv if given
+#   save: also writes the updated .tsv and columnar file of every listing to the data folder of graph_data, and
+#         saves the table as the snapshot load_data loads for these subreddits and time periods.  The snapshot is
+#         only saved when post_table is None, since it must only hold the posts of these listings.
+def run_pipeline(client, subreddits, time_periods, post_table=None, classifier=None, archive_dir=None, limiter=None,
+                 limit=1000, registry=None, save=False):
+    new_table = post_table is None
+    if post_table is None:
+        post_table = PostTable()
+    if registry is None:
+        registry = load_registry()
+    if classifier is None:
+        classifier = RelevanceClassifier()
+    if archive_dir is not None:
+        os.makedirs(archive_dir, exist_ok=True)
+    updated_dir = os.path.join(snapshot.DATA_DIR, 'updated')
+    if save:
+        os.makedirs(updated_dir, exist_ok=True)
+
+    for subreddit in subreddits:
+        for time_period in time_periods:
+            rows = scrape_stage(client, subreddit, time_period, limiter, limit)
+            if archive_dir is not None:
+                rows = archive_stage(rows, os.path.join(archive_dir, subreddit + '_' + time_period + '.tsv'))
+
+            entries = sources_stage(rows)
+            updated_location = os.path.join(updated_dir, subreddit + '_' + time_period + '.tsv')
+            if save:
+                entries = archive_stage(entries, updated_location, UPDATED_COLUMNS + ['id'])
+
+            # Every post of some subreddits is related, ex. r/Coronavirus
+            items = relevance_stage(entries, classifier, registry.get(subreddit).all_relevant)
+
+            time_key = 'all_time' if time_period == 'all' else time_period
+            with stage('pipeline', subreddit=subreddit, time_period=time_period) as loading:
+                loading.rows = load_stage(items, post_table, subreddit, time_key)
+            if save:
+                write_columnar(updated_location, classifier=classifier)
+
+    if save and new_table:
+        time_filters = ['all_time' if time_period == 'all' else time_period for time_period in time_periods]
+        name, key, source_paths = snapshot_settings(subreddits, classifier, time_filters=time_filters)
+        post_table.source_index()  # Saved with the table, the same as the snapshots of load_data
+        save_snapshot(name, source_paths, post_table, key, os.path.join(snapshot.DATA_DIR, 'cache'))
+
+    return post_table
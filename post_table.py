@@ -0,0 +1,337 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Columnar storage for the Reddit posts that are loaded from the updated .tsv files
+"""
+import ast
+import calendar
+import datetime as dt
+import hashlib
+import itertools
+import operator
+import sys
+import time
+from array import array
+
+from aggregate import group_by
+from sources import SourceIndex, source_domain
+
+
+# Keys used for the time filters, in the order the .tsv files are parsed
+TIME_FILTERS = ["all_time", "day", "month", "week"]
+
+
+# Post object that represents a single Reddit post.  Attributes are the following...
+#   ID: id number to reference a post
+#   Title: title of the post
+#   Score: Sum of the "likes"/upvotes minus the sum of the "dislikes"/downvotes, an int.
+#   Num_Comm: Number of comments, an int
+#   Created: Date posted as a UNIX timestamp, see format_created
+#   Content: The text content of the post.  Content with images do not appear.
+#   Relevant:  If it is in regards to COVID-19 in any way, a bool.
+#   Sources: Tuple of the links in the content of the post.
+# Posts only have these attributes, so they don't each need a __dict__ and take up far less memory.
+
+class Post:
+    __slots__ = ("id", "title", "score", "num_comm", "created", "content", "relevant", "sources")
+
+    def __init__(self, id=None, title="", score=0, num_comm=0, created=0, content="", relevant=False, sources=()):
+        self.id = id
+        self.title = title
+        self.score = score
+        self.num_comm = num_comm
+        self.created = created
+        self.content = content
+        self.relevant = relevant
+        self.sources = sources
+
+    # Websites the sources link to, ex. "cdc.gov".  The same website is the same string in every post.
+    @property
+    def domains(self):
+        return [source_domain(source) for source in self.sources]
+
+    # Link posts have no content, so different posts can have the same title and content.  The time a post was
+    # created tells them apart.
+    def __eq__(self, other):
+        if self.title == other.title and self.content == other.content and self.created == other.created:
+            return True
+        return False
+
+
+# Converts the "YYYY-MM-DD HH:MM:SS" date from the .tsv files to a UNIX timestamp.  The scraper writes dates in the
+# local time of the computer it ran on (get_date), which the files don't record, so utc_offset is the seconds that
+# time zone is ahead of UTC, ex. -4 * 3600 for EDT.  With the default of 0 the dates are read as UTC.
+
+def parse_created(created, utc_offset=0):
+    created = created.strip()
+    return calendar.timegm((int(created[0:4]), int(created[5:7]), int(created[8:10]),
+                            int(created[11:13]), int(created[14:16]), int(created[17:19]))) - utc_offset
+
+
+# Converts a UNIX timestamp from parse_created back to the "YYYY-MM-DD HH:MM:SS" format it was read from
+
+def format_created(created, utc_offset=0):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(created + utc_offset))
+
+
+# Reads the sources column of the updated .tsv files, a Python list of links or None, ex. "['https://www.cdc.gov/']".
+# Returns a tuple of the links.  The list is written with repr, so without any " or \ every link is in single quotes
+# and has no quote in it, and the links are split apart without parsing the list as Python.
+
+def parse_sources(sources):
+    if sources == "None" or sources == "" or sources == "[]":
+        return ()
+    if sources.startswith("['") and sources.endswith("']") and '"' not in sources and "\\" not in sources:
+        return tuple(sources[2:-2].split("', '"))
+    return tuple(ast.literal_eval(sources))
+
+
+# Key of a post that has no Reddit id, a hash of the raw bytes of its title, content and created columns.  16 bytes
+# is plenty to tell apart the posts of a subreddit.
+
+def post_digest(title, content, created):
+    return hashlib.blake2b(b"\0".join([title, content, created]), digest_size=16).digest()
+
+
+# Gets the bit of a time filter in the time_filters column
+def time_filter_bit(time_key):
+    return 1 << TIME_FILTERS.index(time_key)
+
+
+# Mask of the rows of a column equal to value, 1 for every match, see PostTable.mask
+
+def _equal_mask(column, value):
+    if getattr(column, "itemsize", None) == 1:
+        low = -128 if column.typecode == "b" else 0
+        if not low <= value < low + 256:
+            return bytes(len(column))
+        table = bytearray(256)
+        table[value & 0xFF] = 1
+        return column.tobytes().translate(table)
+    return bytes(map(operator.eq, column, itertools.repeat(value)))
+
+
+# Table of posts stored by column instead of by Post object.  Every post is one row, and row i of every column
+# belongs to the same post.  Numeric columns are arrays so charts can count and average them with masks.
+# A post that is in more than one time filter is only stored once, in the row for its key.
+#   score, num_comm: engagement of the post
+#   created: UNIX timestamp of the post
+#   weekday, month, hour, iso_week, date: when the post was made in the time zone of the .tsv files, worked out once
+#       when the post is added.  weekday 0 is Monday, month 1 is January, date is days since 1970-01-01.
+#   relevant, has_sources: 1 or 0 flags.  relevant is -1 for a post added with relevant None (or -1), which isn't
+#       classified yet.
+#   subreddit: index into subreddits
+#   time_filters: bit i is set if the post is in the top posts of TIME_FILTERS[i]
+#   titles, contents: the text of the post
+#   sources: tuple of the links in the content of the post, see source_index for them normalized and indexed
+
+class PostTable:
+
+    def __init__(self, utc_offset=0):
+        self.utc_offset = utc_offset
+        self.subreddits = list()
+        self.score = array("q")
+        self.num_comm = array("q")
+        self.created = array("q")
+        self.weekday = array("B")
+        self.month = array("B")
+        self.hour = array("B")
+        self.iso_week = array("B")
+        self.date = array("l")
+        self.relevant = array("b")
+        self.has_sources = array("b")
+        self.subreddit = array("H")
+        self.time_filters = array("B")
+        self.titles = list()
+        self.contents = list()
+        self.sources = list()
+        self._index = dict()
+        self._source_index = None
+
+    def __len__(self):
+        return len(self.score)
+
+    # Gets the id of a subreddit, adding it to the table if add is True.  Returns -1 for an unknown subreddit.
+    def subreddit_id(self, sub_reddit_name, add=False):
+        sub_reddit_name = sub_reddit_name.lower()
+        if sub_reddit_name in self.subreddits:
+            return self.subreddits.index(sub_reddit_name)
+        if add:
+            self.subreddits.append(sub_reddit_name)
+            return len(self.subreddits) - 1
+        return -1
+
+    # Adds a post that is in the top posts of time_key.  If the post is already in the table it is only marked as
+    # being in time_key too, and keeps the values it was first added with.  Returns the row of the post.
+    #   key: what makes a post the same post within its subreddit, ex. its Reddit id.  If None the title, content
+    #        and created time are the key, the same as Post.__eq__.
+    def append(self, sub_reddit_name, time_key, title, score, num_comm, created, content, relevant, sources,
+               key=None):
+        sub_id = self.subreddit_id(sub_reddit_name, add=True)
+        if key is None:
+            key = (title, content, created)
+
+        row = self._index.get((sub_id, key))
+        if row is not None:
+            self.time_filters[row] |= time_filter_bit(time_key)
+            return row
+
+        row = len(self)
+        self._index[(sub_id, key)] = row
+        self._source_index = None
+
+        self.score.append(int(score))
+        self.num_comm.append(int(num_comm))
+        if isinstance(created, str):
+            created = parse_created(created, self.utc_offset)
+        self.created.append(created)
+        self._append_date(created)
+        self.relevant.append(-1 if relevant is None or relevant == -1 else 1 if relevant else 0)
+        self.has_sources.append(1 if len(sources) > 0 else 0)
+        self.subreddit.append(sub_id)
+        self.time_filters.append(time_filter_bit(time_key))
+
+        self.titles.append(title)
+        self.contents.append(content)
+        self.sources.append(tuple(sources))
+        return row
+
+    # Adds every post of another table.  Posts that are in both tables are kept once, in every time filter they are
+    # in between the two.
+    def extend(self, other):
+        for (sub_id, key), row in other._index.items():
+            time_filters = other.time_filters[row]
+            time_key = TIME_FILTERS[(time_filters & -time_filters).bit_length() - 1]
+            new_row = self.append(other.subreddits[sub_id], time_key, other.titles[row], other.score[row],
+                                  other.num_comm[row], other.created[row], other.contents[row], other.relevant[row],
+                                  other.sources[row], key)
+            self.time_filters[new_row] |= time_filters
+
+    # Replaces the relevant column, ex. with the flags of another classifier from TextIndex.classify
+    def set_relevant(self, relevant):
+        if len(relevant) != len(self):
+            raise ValueError("Expected " + str(len(self)) + " flags, got " + str(len(relevant)))
+        self.relevant = array("b", relevant)
+        self._source_index = None
+
+    # Gets the key of every row, see append
+    def keys(self):
+        keys = [None] * len(self)
+        for (sub_id, key), row in self._index.items():
+            keys[row] = key
+        return keys
+
+    # About how many bytes of memory the posts of the table take up
+    def nbytes(self):
+        size = 0
+        for column in self.__dict__.values():
+            if isinstance(column, array):
+                size += column.itemsize * len(column)
+        for text in itertools.chain(self.titles, self.contents):
+            size += sys.getsizeof(text)
+        for sources in self.sources:
+            size += sys.getsizeof(sources) + sum(sys.getsizeof(source) for source in sources)
+        if self._source_index is not None:
+            size += self._source_index.nbytes()
+        return size
+
+    # Gets the links and websites cited by the posts, with the posts citing every website, see SourceIndex.  load_data
+    # builds it before saving the table as a snapshot, so a table loaded from a snapshot already has it.  Otherwise
+    # it is built the first time it is asked for after posts were added.
+    def source_index(self):
+        if self._source_index is None:
+            self._source_index = SourceIndex(self)
+        return self._source_index
+
+    # Adds the calendar columns of a post created at a UNIX timestamp
+    def _append_date(self, created):
+        local = created + self.utc_offset
+        date = time.gmtime(local)
+        self.weekday.append(date.tm_wday)
+        self.month.append(date.tm_mon)
+        self.hour.append(date.tm_hour)
+        self.iso_week.append(dt.date(date.tm_year, date.tm_mon, date.tm_mday).isocalendar()[1])
+        self.date.append(local // 86400)
+
+    # Builds a Post object for a single row of the table
+    def post(self, row):
+        return Post(row, self.titles[row], self.score[row], self.num_comm[row], self.created[row], self.contents[row],
+                    self.relevant[row] == 1, self.sources[row])
+
+    # Gets a column by name
+    def column(self, name):
+        return getattr(self, name)
+
+    # Builds a mask of the rows that match every condition, ex. mask(subreddit="News", relevant=True), as a bytearray
+    # with 1 for every selected row.  time_filter="week" selects the posts that are in the week's top posts.  A
+    # condition of None is ignored.
+    # Columns of one byte are matched with bytes.translate and the masks of the conditions are joined with one &
+    # of big integers, so no loop over the rows runs in Python.
+    def mask(self, **conditions):
+        selected = None
+
+        for name, value in conditions.items():
+            if value is None:
+                continue
+            if name == "time_filter":
+                bit = time_filter_bit(value)
+                matches = self.time_filters.tobytes().translate(bytes(int(i & bit != 0) for i in range(256)))
+            else:
+                if name == "subreddit":
+                    value = self.subreddit_id(value)
+                matches = _equal_mask(self.column(name), value)
+
+            if selected is None:
+                selected = matches
+            else:
+                selected = (int.from_bytes(selected, "little") & int.from_bytes(matches, "little")).to_bytes(
+                    len(self), "little")
+
+        if selected is None:
+            return bytearray(b"\x01") * len(self)
+        return bytearray(selected)
+
+    # Number of rows selected by a mask
+    @staticmethod
+    def count(mask):
+        return mask.count(1)
+
+    # Sum of a column over the rows selected by a mask
+    def total(self, name, mask):
+        return sum(itertools.compress(self.column(name), mask))
+
+    # Mean of a column over the rows selected by a mask.  0 if no rows are selected.
+    def mean(self, name, mask):
+        count = self.count(mask)
+        if count == 0:
+            return 0
+        return self.total(name, mask) / count
+
+    # Groups the rows by key columns and computes metrics of a column for every group, see aggregate.group_by.
+    # Subreddits in the groups are their names instead of their ids, ex.
+    #   aggregate(["subreddit", "relevant"], "score", ["mean"]) -> {"mean": {("news", 1): 2051.4, ...}}
+    #   where: conditions of the rows to use, the same as mask
+    def aggregate(self, keys, value=None, metrics=("mean",), **where):
+        columns = [self.column(name) for name in keys]
+        values = self.column(value) if value is not None else None
+        mask = self.mask(**where) if len(where) > 0 else None
+        result = group_by(columns, values, metrics, mask)
+        if "subreddit" in keys:  # Grouped by id, and only the few groups are renamed
+            i = keys.index("subreddit")
+            result = {metric: {group[:i] + (self.subreddits[group[i]],) + group[i + 1:]: group_value
+                               for group, group_value in groups.items()}
+                      for metric, groups in result.items()}
+        return result
+
+    # The n websites cited by the most posts matching the conditions, as (domain, posts) pairs, from the source index,
+    # ex. top_domains(10, subreddit="News", relevant=True).  Without conditions the totals of the index are used.
+    def top_domains(self, n=10, **where):
+        mask = self.mask(**where) if len(where) > 0 else None
+        return self.source_index().top_domains(n, "posts", mask)
+
+    # Mean of a column over the posts citing a website that match the conditions, ex.
+    #   domain_mean("cdc.gov", "score", relevant=True)
+    def domain_mean(self, domain, name, **where):
+        if name not in ("score", "num_comm"):
+            raise ValueError("Unknown column " + name + ", expected one of score, num_comm")
+        mask = self.mask(**where) if len(where) > 0 else None
+        return self.source_index().engagement(domain, mask)["mean_" + name]
@@ -1,22 +1,37 @@
 # Author: Anthony, Parker, Grace, Drake
 # CSCI529: GROUP PROJECT
 
+import argparse
+
 import praw
-import datetime as dt
-import csv
+from enrich import enrich_file, enrich_files
+from fake_reddit import FakeReddit
+from pipeline import run_pipeline
+from registry import load_registry
+from scraper import RateLimiter, get_listing, write_listing, scrape_all
+
+
+# Makes a new client that accesses REDDIT.  Every thread that scrapes needs its own.
+def make_reddit():
+    return praw.Reddit(client_id='qzAog3zZ9acCgQ',
+                       client_secret='4Z2VLmc1o5tfQWym_0Oei7xt8Is',
+                       user_agent='CSCI529.PROJ.COVID',
+                       USERNAME='CSCI529_USER',
+                       PASSWORD='csci.529.covid')
+
 
 # Variable that accesses REDDIT
-reddit = praw.Reddit(client_id='qzAog3zZ9acCgQ',
-                     client_secret='4Z2VLmc1o5tfQWym_0Oei7xt8Is',
-                     user_agent='CSCI529.PROJ.COVID',
-                     USERNAME='CSCI529_USER',
-                     PASSWORD='csci.529.covid')
+reddit = make_reddit()
+
+# Subreddits and time filters to scrape, from subreddits.json
+REGISTRY = load_registry()
 
 # What time period to scrape from Reddit
 ALL = 'all'
 MONTH = 'month'
 WEEK = 'week'
 DAY = 'day'
+TIME_PERIODS = REGISTRY.time_periods()
 
 CORONA = 'coronavirus'
 NEWS = 'news'
@@ -24,98 +39,83 @@ SCIENCE = 'science'
 WORLD = 'worldnews'
 
 
-# changes created UNIX time to standard
-def get_date(created):
-    return dt.datetime.fromtimestamp(created)
-
-
 # Gets posts from a certain time period, the sub reddit as well as puts it in a .tsv
-def scrape(filename, subreddit, time_period):
-    sub = reddit.subreddit(subreddit)  # Only accesses the specifed subreddit
+def scrape(filename, subreddit, time_period, client=None):
+    if client is None:
+        client = reddit
     # top_subreddit = corona.top(limit=x)  # gives you the top x posts of ALL TIME, limit is 1000
-    top_subreddit = sub.top(limit=1000, time_filter=time_period)
-    file_location = 'data/original'+filename
-    table = open(file_location, 'w', encoding='utf-8')
-    writer = csv.writer(table, delimiter='\t')
-    writer.writerow(['title', 'score', 'num_comm', 'created', 'content'])
-
-    # Writes the information into the .tsv
-    for post in top_subreddit:
-        row = [post.title, post.score,
-               post.num_comments, get_date(post.created),
-               post.selftext]
-        writer.writerow(row)
-
-    table.close()
+    rows = get_listing(client, subreddit, time_period)
+    write_listing('data/original/' + filename, rows)
 
 
 # Gets the top 100 of each time frame from a single subreddit into their respective .tsv
 def get_data(subreddit):
-    scrape(subreddit + '_all.tsv', subreddit, ALL)
-    scrape(subreddit + '_month.tsv', subreddit, MONTH)
-    scrape(subreddit + '_week.tsv', subreddit, WEEK)
-    scrape(subreddit + '_day.tsv', subreddit, DAY)
-
-
-# Gets the sources that are in the post if it is in the content
-def list_post_sources(entry):
-    sources = []
-    end_index = -1
-    # filters out for posts that have content and if they have a source in the content
-    if len(entry) == 5 and '](http' in entry[4]:
-        content = entry[4]
-        while end_index != len(content):
-            start_index = int(content.find('](http')) + 2
-            end_index = start_index + int(content[start_index:].find(')'))
-            if end_index == 0:
-                break
-            sources.append(content[start_index:end_index])
-            content = content[end_index + 1:]
-    else:
-        entry.pop()  # Removes the blank entry for content and replaces it with none then fills sources with none
-        entry.append('None')
-        entry.append('None')
-        return entry
-    entry.append(sources)
-    return entry
+    for time_period in TIME_PERIODS:
+        scrape(subreddit + '_' + time_period + '.tsv', subreddit, time_period)
+
+
+# Gets every time frame of every subreddit into their respective .tsv, scraping the listings at the same time.
+# Pass a client_factory such as fake_reddit.FakeReddit to try it without going online.
+# With incremental=True only new posts are added and changed scores and comments are updated, see scrape_incremental.
+def get_all_data(subreddits, client_factory=make_reddit, max_workers=8, incremental=False):
+    return scrape_all(subreddits, TIME_PERIODS, client_factory, out_dir='data/original', max_workers=max_workers,
+                      incremental=incremental)
 
 
 # Goes through an entire .tsv or a subreddit of a specific time frame and adds the sources if available to each entry
 def list_time_frame_sources(subreddit, timeframe):
-    new = open('data/updated/' + subreddit + '_' + timeframe + '.tsv', 'w', encoding='utf-8')
-    writer = csv.writer(new, delimiter='\t')
-    writer.writerow(['title', 'score', 'num_comm', 'created', 'content', 'sources'])
+    enrich_file('data/original/' + subreddit + '_' + timeframe + '.tsv',
+                'data/updated/' + subreddit + '_' + timeframe + '.tsv')
 
-    with open('data/original/' + subreddit + '_' + timeframe + '.tsv', 'r', encoding='utf-8') as file:
-        reader = csv.reader(file, delimiter='\t')
 
-        for entry in reader:
-            if len(entry) != 0 and entry[0] != 'title':
-                writer.writerow(list_post_sources(entry))
+# Goes through all the subreddits and adds a source attribute to the entry
+def list_subreddit_sources(subreddit):
+    for time_period in TIME_PERIODS:
+        list_time_frame_sources(subreddit, time_period)
+
 
-    new.close()
+# Adds the sources of every time frame of every subreddit, with many files at the same time on a pool of processes.
+# chunk_rows also splits each file into chunks of that many rows.
+def list_all_sources(subreddits, processes=None, chunk_rows=None):
+    file_pairs = [('data/original/' + subreddit + '_' + timeframe + '.tsv',
+                   'data/updated/' + subreddit + '_' + timeframe + '.tsv')
+                  for subreddit in subreddits for timeframe in TIME_PERIODS]
+    return enrich_files(file_pairs, processes, chunk_rows)
 
 
-# Goes through all the subreddits and adds a source attribute to the entry
-def list_subreddit_sources(subreddit):
-    list_time_frame_sources(subreddit, ALL)
-    list_time_frame_sources(subreddit, MONTH)
-    list_time_frame_sources(subreddit, WEEK)
-    list_time_frame_sources(subreddit, DAY)
+# Scrapes every time frame of every subreddit straight into the updated .tsv and columnar files and the snapshot that
+# the charts load, keeping a copy of what was scraped in data/original, see run_pipeline.  This is what to run to
+# bring the data up to date.
+def refresh_data(subreddits, client=None):
+    if client is None:
+        client = reddit
+    return run_pipeline(client, subreddits, TIME_PERIODS, archive_dir='data/original', limiter=RateLimiter(),
+                        save=True)
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Scrapes posts from Reddit and lists the sources of every post')
+    parser.add_argument('command', nargs='?', default='sources', choices=['sources', 'refresh'],
+                        help='sources lists the sources of the .tsv files in data/original, refresh scrapes every '
+                             'subreddit again and updates the data the charts load')
+    parser.add_argument('--fake', action='store_true', help='refresh with made up posts instead of going online')
+    args = parser.parse_args()
+
+    if args.command == 'refresh':
+        post_table = refresh_data(REGISTRY.names(), FakeReddit() if args.fake else None)
+        print('Refreshed ' + str(len(post_table)) + ' posts')
+        return
+
     # Used to get all .tsv do not want to use as it will change original data
-    # get_data('coronavirus')
-    # get_data('news')
-    # get_data('worldnews')
-    # get_data('science')
+    # for subreddit in REGISTRY.names():
+    #     get_data(subreddit)
+    # Or all of them at the same time
+    # get_all_data(REGISTRY.names())
+    # Or only what changed since the last time
+    # get_all_data(REGISTRY.names(), incremental=True)
 
     # Used to list the sources in each post for each .tsv
-    list_subreddit_sources(CORONA)
-    list_subreddit_sources(NEWS)
-    list_subreddit_sources(SCIENCE)
-    list_subreddit_sources(WORLD)
+    list_all_sources(REGISTRY.names())
 
 
 if __name__ == '__main__':
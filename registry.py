@@ -0,0 +1,75 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Reads the subreddits that are scraped, loaded and graphed from subreddits.json, so subreddits can be
+    added without changing any code.  Every subreddit in the file looks like
+        {"name": "worldnews", "label": "WorldNews", "all_relevant": false, "all_linked": true}
+    name: name on Reddit, also used for the .tsv files, ex. data/updated/worldnews_day.tsv
+    label: name shown on the graphs, the name if not given
+    all_relevant: every post is COVID related, ex. r/Coronavirus removes any post that isn't
+    all_linked: every post links to a source, ex. r/WorldNews only allows links to news articles
+"""
+import json
+
+from post_table import TIME_FILTERS
+
+REGISTRY_FILE = "subreddits.json"
+
+
+class Subreddit:
+
+    def __init__(self, name, label=None, all_relevant=False, all_linked=False):
+        self.name = name.lower()
+        self.label = label if label is not None else name
+        self.all_relevant = all_relevant
+        self.all_linked = all_linked
+
+
+# Subreddits and time filters to use, in the order they are graphed
+#   time_filters: keys of TIME_FILTERS to scrape and load
+
+class Registry:
+
+    def __init__(self, subreddits, time_filters=None):
+        self.subreddits = list(subreddits)
+        self.time_filters = list(time_filters) if time_filters is not None else list(TIME_FILTERS)
+        for time_key in self.time_filters:
+            if time_key not in TIME_FILTERS:
+                raise ValueError("Unknown time filter " + time_key + ", expected one of " + ", ".join(TIME_FILTERS))
+        self._by_name = {subreddit.name: subreddit for subreddit in self.subreddits}
+        self._by_name.update({subreddit.label.lower(): subreddit for subreddit in self.subreddits})
+
+    def __iter__(self):
+        return iter(self.subreddits)
+
+    def __len__(self):
+        return len(self.subreddits)
+
+    def __contains__(self, name):
+        return name.lower() in self._by_name
+
+    # Gets a subreddit by its name or label in any case.  A subreddit that isn't in the registry has no rules.
+    def get(self, name):
+        if name.lower() in self._by_name:
+            return self._by_name[name.lower()]
+        return Subreddit(name)
+
+    def names(self):
+        return [subreddit.name for subreddit in self.subreddits]
+
+    def labels(self):
+        return [subreddit.label for subreddit in self.subreddits]
+
+    # Time filters as the time periods Reddit and the .tsv file names use, "all" instead of "all_time"
+    def time_periods(self):
+        return ["all" if time_key == "all_time" else time_key for time_key in self.time_filters]
+
+
+# Reads a registry from a JSON file
+def load_registry(path=REGISTRY_FILE):
+    with open(path, "r", encoding="utf-8") as file:
+        config = json.load(file)
+
+    subreddits = [Subreddit(entry["name"], entry.get("label"), entry.get("all_relevant", False),
+                            entry.get("all_linked", False))
+                  for entry in config["subreddits"]]
+    return Registry(subreddits, config.get("time_filters"))
@@ -0,0 +1,190 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Decides if the text of a post is related to COVID-19 by searching it for keywords
+"""
+import itertools
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from instrument import timed
+
+
+# Keywords that make a post COVID related
+DEFAULT_KEYWORDS = ["coronavirus", "covid", "sars-cov-2", "pandemic", "corona"]
+
+
+# Letters that also match letters outside ASCII when case is ignored, ex. "k" matches the Kelvin sign "\u212a"
+_NON_ASCII_CASES = {"i": "\u0130\u0131", "k": "\u212a", "s": "\u017f"}
+
+
+# Pattern of a character that also matches its letters of _NON_ASCII_CASES, ex. "(?:k|\u212a)" for "k".  Used for
+# bytes patterns, where each of those letters is more than one byte.
+
+def _escape_cases(char):
+    if char in _NON_ASCII_CASES:
+        return "(?:" + "|".join([char] + list(_NON_ASCII_CASES[char])) + ")"
+    return re.escape(char)
+
+
+# Builds a regex from a trie of the keywords so that keywords sharing a prefix are only compared once,
+# ex. ["covid", "corona"] becomes "co(?:rona|vid)"
+#   escape: makes the pattern of one character
+
+def _trie_pattern(keywords, escape=re.escape):
+    trie = dict()
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, dict())
+        node[""] = None  # Marks the end of a keyword
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+
+        branches = [escape(char) + build(node[char]) for char in sorted(node) if char != ""]
+        if len(branches) == 1:
+            pattern = branches[0]
+        else:
+            pattern = "(?:" + "|".join(branches) + ")"
+
+        if "" in node:  # A keyword ends here but longer keywords continue
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+# Classifies text as COVID related or not.  All keywords are compiled into a single regex so each text is only
+# scanned once no matter how many keywords there are.
+#   keywords: words or phrases to search for
+#   word_boundary: only match keywords that are not part of a larger word, ex. "corona" will not match "coronas"
+#   ignore_case: match keywords in any case
+
+class RelevanceClassifier:
+
+    def __init__(self, keywords=None, word_boundary=False, ignore_case=True):
+        if keywords is None:
+            keywords = DEFAULT_KEYWORDS
+        self.keywords = [keyword.lower() if ignore_case else keyword for keyword in keywords]
+        self.word_boundary = word_boundary
+        self.ignore_case = ignore_case
+
+        search_keywords = set(self.keywords)
+        if not word_boundary:
+            # Any keyword that contains another keyword can never change the result, ex. "coronavirus" and "corona"
+            search_keywords = [keyword for keyword in search_keywords
+                               if not any(other != keyword and other in keyword for other in search_keywords)]
+
+        if len(search_keywords) == 0:
+            pattern = "(?!)"  # Nothing is relevant without keywords
+        else:
+            pattern = _trie_pattern(search_keywords)
+        if word_boundary:
+            pattern = r"(?<!\w)" + pattern + r"(?!\w)"
+        self.pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+        # UTF-8 bytes are searched without decoding them when that finds the same posts as searching the text.  \w
+        # and ignoring case only know ASCII in bytes, so that is when every keyword is ASCII and there are no word
+        # boundaries.  The letters of _NON_ASCII_CASES also search for their other letters.  Quotes and line breaks
+        # are escaped in the bytes of a .tsv field.  Otherwise bytes_pattern is None and bytes are decoded.
+        self.bytes_pattern = None
+        if not word_boundary and all(keyword.isascii() and not any(char in keyword for char in '"\r\n')
+                                     for keyword in self.keywords):
+            bytes_pattern = "(?!)" if len(search_keywords) == 0 else \
+                _trie_pattern(search_keywords, _escape_cases if ignore_case else re.escape)
+            self.bytes_pattern = re.compile(bytes_pattern.encode("utf-8"), re.IGNORECASE if ignore_case else 0)
+
+    # True if any keyword is in the text.  The text can be a str or UTF-8 bytes.
+    def is_relevant(self, text):
+        if isinstance(text, str):
+            return self.pattern.search(text) is not None
+        if self.bytes_pattern is None:
+            return self.pattern.search(str(text, "utf-8")) is not None
+        return self.bytes_pattern.search(text) is not None
+
+    # Classifies every text, returning a list of True/False in the same order
+    @timed()
+    def classify(self, texts):
+        if self.bytes_pattern is None:
+            return [self.is_relevant(text) for text in texts]
+        search = self.pattern.search
+        bytes_search = self.bytes_pattern.search
+        return [(search(text) if isinstance(text, str) else bytes_search(text)) is not None for text in texts]
+
+
+# Rows classified by one task of classify_parallel
+CHUNK_ROWS = 10_000
+
+
+# Classifies the title and content of every post on a pool of processes, the same as
+#   classifier.is_relevant(title) or classifier.is_relevant(content)
+# for every pair of titles and contents.  The text is written once to shared memory as UTF-8 and every task only
+# gets the rows it classifies, so no text is pickled.  Each task writes its flags back to shared memory.  Titles are
+# searched as text like parse_data does, contents as bytes when the classifier can search bytes.
+#   processes: size of the pool, one per core if None.  1 classifies in this process.
+# Returns an array of 1 or 0 flags.
+@timed()
+def classify_parallel(classifier, titles, contents, processes=None, chunk_rows=CHUNK_ROWS):
+    rows = len(titles)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or rows <= chunk_rows:
+        return array("b", [classifier.is_relevant(title) or classifier.is_relevant(content.encode("utf-8"))
+                           for title, content in zip(titles, contents)])
+
+    title_offsets, title_blob = _pack(titles)
+    content_offsets, content_blob = _pack(contents)
+
+    # Layout of the shared memory: title offsets, content offsets, titles, contents, one flag for every row
+    layout = list(itertools.accumulate([0, 8 * (rows + 1), 8 * (rows + 1), len(title_blob), len(content_blob), rows]))
+    memory = shared_memory.SharedMemory(create=True, size=max(layout[-1], 1))
+    try:
+        for start, data in zip(layout, [title_offsets.tobytes(), content_offsets.tobytes(), title_blob,
+                                        content_blob]):
+            memory.buf[start:start + len(data)] = data
+        del title_blob, content_blob
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            tasks = [pool.submit(_classify_chunk, memory.name, layout, classifier, start, min(start + chunk_rows, rows))
+                     for start in range(0, rows, chunk_rows)]
+            for task in tasks:
+                task.result()
+        flags = array("b")
+        flags.frombytes(memory.buf[layout[4]:layout[5]])
+        return flags
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+# Encodes texts as one block of UTF-8 and the offsets of every text in it
+def _pack(texts):
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = array("q", [0])
+    offsets.extend(itertools.accumulate(len(text) for text in encoded))
+    return offsets, b"".join(encoded)
+
+
+# Classifies rows start to end of the shared memory of classify_parallel and writes their flags
+def _classify_chunk(name, layout, classifier, start, end):
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        buffer = memory.buf
+        title_offsets = buffer[layout[0]:layout[1]].cast("q")
+        content_offsets = buffer[layout[1]:layout[2]].cast("q")
+        titles = buffer[layout[2]:layout[3]]
+        contents = buffer[layout[3]:layout[4]]
+        flags = buffer[layout[4]:layout[5]]
+
+        for row in range(start, end):
+            title = str(titles[title_offsets[row]:title_offsets[row + 1]], "utf-8")
+            flags[row] = classifier.is_relevant(title) or \
+                classifier.is_relevant(contents[content_offsets[row]:content_offsets[row + 1]])
+
+        del title_offsets, content_offsets, titles, contents, flags, buffer
+    finally:
+        memory.close()
@@ -0,0 +1,95 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Renders every chart to files without opening a browser, so all of them can be made in one unattended
+    run.  ex. python render.py writes every chart to charts/ as .html
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.offline
+
+from graph_data import REGISTRY, graph_covid_engagement, graph_covid_post_count, \
+    graph_covid_source_engagement, graph_sources_in_covid_posts, graph_time_series_engagement_daily, \
+    graph_time_series_engagement_monthly, graph_top_source_domains, load_data, write_figure
+from instrument import stage
+
+OUT_DIR = "charts"
+ENGAGEMENT_TYPES = ["score", "comments"]
+
+# Every .html chart loads plotly.js from this file next to it instead of holding its own 3 MB copy
+PLOTLY_JS = "plotly.min.js"
+
+
+# Builds every chart for every subreddit and time filter of the registry and every engagement type.  Returns a list of
+# (file name without extension, figure).
+
+def build_all(post_table):
+    charts = list()
+    for subreddit in REGISTRY:
+        sub_reddit_name = subreddit.label
+        name = subreddit.name
+        for time_key, fig in zip(REGISTRY.time_filters,
+                                 graph_covid_post_count(sub_reddit_name, post_table, show=False)):
+            charts.append(("covid_post_count_" + name + "_" + time_key, fig))
+        for time_key, fig in zip(REGISTRY.time_filters,
+                                 graph_sources_in_covid_posts(sub_reddit_name, post_table, show=False)):
+            charts.append(("sources_in_covid_posts_" + name + "_" + time_key, fig))
+
+        for engagement_type in ENGAGEMENT_TYPES:
+            charts.append(("daily_" + engagement_type + "_" + name,
+                           graph_time_series_engagement_daily(sub_reddit_name, post_table, engagement_type, show=False)))
+            charts.append(("monthly_" + engagement_type + "_" + name,
+                           graph_time_series_engagement_monthly(sub_reddit_name, post_table, engagement_type,
+                                                                show=False)))
+
+    for engagement_type in ENGAGEMENT_TYPES:
+        charts.append(("covid_engagement_" + engagement_type,
+                       graph_covid_engagement(post_table, engagement_type, show=False)))
+        charts.append(("covid_source_engagement_" + engagement_type,
+                       graph_covid_source_engagement(post_table, engagement_type, show=False)))
+        charts.append(("top_source_domains_" + engagement_type,
+                       graph_top_source_domains(post_table, engagement_type, show=False)))
+
+    return charts
+
+
+# Writes a figure in every format, ex. html and png.  Runs in the worker processes.  Returns the paths written.
+def _write_chart(out_dir, name, fig, formats):
+    paths = list()
+    for file_format in formats:
+        path = os.path.join(out_dir, name + "." + file_format)
+        write_figure(fig, path)
+        paths.append(path)
+    return paths
+
+
+# Writes every chart to out_dir in each of formats, "html" or an image format like "png" or "svg".  The figures are
+# built here and written by a pool of processes, since writing images is what takes the time.  Returns the paths of
+# every file written.
+#   processes: number of processes, one for every CPU if None
+
+def render_all(post_table, out_dir=OUT_DIR, formats=("html",), processes=None):
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Written once before the workers start so they don't all try to write it at the same time
+    if "html" in formats:
+        with open(os.path.join(out_dir, PLOTLY_JS), "w", encoding="utf-8") as file:
+            file.write(plotly.offline.get_plotlyjs())
+
+    with stage("build_charts") as building:
+        charts = build_all(post_table)
+        building.rows = len(charts)
+
+    paths = list()
+    with stage("write_charts", formats=list(formats)) as writing:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_write_chart, out_dir, name, fig, formats) for name, fig in charts]
+            for future in futures:
+                paths.extend(future.result())
+        writing.rows = len(paths)
+    return paths
+
+
+if __name__ == '__main__':
+    written = render_all(load_data(REGISTRY.names()))
+    print("Wrote " + str(len(written)) + " charts to " + OUT_DIR)
@@ -0,0 +1,158 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Writes the data dictionary, a text report of every post of every subreddit and time filter.  Posts are
+    streamed from the updated .tsv files to the report one at a time, so a report of any size is written in the same
+    memory.  Every (subreddit, time filter) section is kept in data/cache/report and only written again when its .tsv
+    changed.
+Run from the top folder of the project, ex.
+    python report.py                                   # data/data_dictionary.txt
+    python report.py --subreddit News --time-filter day --relevant --out /tmp/news_covid_day.txt
+"""
+import argparse
+import json
+import os
+import shutil
+
+import graph_data
+from post_table import parse_sources
+import snapshot
+from snapshot import COVID_CLASSIFIER, REGISTRY, check_sources, data_files, file_signature
+from tsv_reader import read_tsv
+
+# Changing this makes every saved section out of date.  Needed when the layout of an entry changes.
+REPORT_VERSION = 1
+
+# Bytes written to the report at a time
+BUFFER_SIZE = 1 << 20
+
+SUBREDDIT_HEADER = "========================================== r/{} Data ==========================================\n"
+SECTION_HEADER = "Sorted by: {}"
+ENTRY = ("\n\t\t\tTitle: {}"
+         "\n\t\t\tScore: {}"
+         "\n\t\t\tNumber of Comments: {}"
+         "\n\t\t\tDate Created: {}"
+         "\n\t\t\tPost Content: {}"
+         "\n\t\t\tCOVID Related?: {}"
+         "\n\t\t\tSources: {}\n")
+
+
+# Yields every post of the .tsv of a subreddit and time filter as the text of its entry, decided the same way as
+# parse_data.  relevant=True only yields COVID related posts, False only the others, None every post.
+
+def section_entries(sub_reddit_name, time_key, classifier=None, relevant=None):
+    if classifier is None:
+        classifier = COVID_CLASSIFIER
+    all_relevant = REGISTRY.get(sub_reddit_name).all_relevant
+
+    for record in read_tsv(data_files(sub_reddit_name, [time_key], columnar=False)[0], columns=graph_data.TSV_COLUMNS):
+        title = record["title"]
+        has_content = record.raw("content") != b"None"
+        post_relevant = all_relevant or classifier.is_relevant(title) or \
+            (has_content and classifier.is_relevant(record.raw("content")))
+        if relevant is not None and post_relevant != relevant:
+            continue
+
+        content = record["content"] if has_content else ""
+        sources = list(parse_sources(record["sources"])) if record.raw("sources") != b"None" else list()
+        yield ENTRY.format(title, record["score"], record["num_comm"], record["created"], content,
+                           post_relevant, sources)
+
+
+# Writes the section of a subreddit and time filter to path through a buffer.  Returns the number of entries.
+
+def write_section(path, sub_reddit_name, time_key, classifier=None, relevant=None):
+    entries = 0
+    with open(path + ".tmp", "w", encoding="utf8", buffering=BUFFER_SIZE) as file:
+        file.write(SECTION_HEADER.format(time_key))
+        for entry in section_entries(sub_reddit_name, time_key, classifier, relevant):
+            file.write(entry)
+            entries += 1
+    os.replace(path + ".tmp", path)
+    return entries
+
+
+# Writes the data dictionary of the subreddits and time filters to out_path.  Sections whose .tsv didn't change since
+# they were last written with the same filters are copied from cache_dir instead of being written again.
+#   sub_reddit_names: names or labels, every subreddit of the registry if None
+#   time_filters: every time filter of the registry if None
+#   relevant: True for only COVID related posts, False for only the others, None for every post
+#   incremental: False writes every section again
+# Returns {"written": sections written, "reused": sections copied from the cache, "entries": entries written}
+
+def write_report(out_path=None, sub_reddit_names=None, time_filters=None, relevant=None, classifier=None,
+                 cache_dir=None, incremental=True):
+    if out_path is None:
+        out_path = os.path.join(snapshot.DATA_DIR, "data_dictionary.txt")
+    if cache_dir is None:
+        cache_dir = os.path.join(snapshot.DATA_DIR, "cache", "report")
+    if classifier is None:
+        classifier = COVID_CLASSIFIER
+    subreddits = [REGISTRY.get(name) for name in sub_reddit_names or REGISTRY.names()]
+    time_filters = time_filters or REGISTRY.time_filters
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    try:
+        with open(manifest_path, "r", encoding="utf8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = dict()
+
+    stats = {"written": 0, "reused": 0, "entries": 0}
+    with open(out_path + ".tmp", "w", encoding="utf8", buffering=BUFFER_SIZE) as report:
+        for subreddit in subreddits:
+            report.write(SUBREDDIT_HEADER.format(subreddit.label))
+            for time_key in time_filters:
+                section = "{}_{}{}".format(subreddit.name, time_key, "" if relevant is None else "_" + str(relevant))
+                section_path = os.path.join(cache_dir, section + ".txt")
+                source_paths = data_files(subreddit.name, [time_key], columnar=False)
+                key = {"version": REPORT_VERSION, "pattern": classifier.pattern.pattern,
+                       "flags": classifier.pattern.flags, "all_relevant": subreddit.all_relevant}
+
+                saved = manifest.get(section)
+                sources = None
+                if incremental and saved is not None and saved["key"] == key and os.path.exists(section_path):
+                    sources = check_sources(saved["sources"], source_paths)
+
+                if sources is None:
+                    # Signatures are taken before writing so a .tsv that changes meanwhile is written again next time
+                    sources = {path: file_signature(path) for path in source_paths}
+                    stats["entries"] += write_section(section_path, subreddit.name, time_key, classifier, relevant)
+                    stats["written"] += 1
+                else:
+                    stats["reused"] += 1
+                manifest[section] = {"key": key, "sources": sources}
+
+                with open(section_path, "r", encoding="utf8") as file:
+                    shutil.copyfileobj(file, report, BUFFER_SIZE)
+    os.replace(out_path + ".tmp", out_path)
+
+    with open(manifest_path + ".tmp", "w", encoding="utf8") as file:
+        json.dump(manifest, file)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes the data dictionary of the updated posts")
+    parser.add_argument("--out", help="file to write, data_dictionary.txt in the data folder by default")
+    parser.add_argument("--subreddit", dest="subreddits", action="append", choices=REGISTRY.labels(),
+                        type=lambda name: REGISTRY.get(name).label, help="only this subreddit, can be given more "
+                                                                          "than once")
+    parser.add_argument("--time-filter", dest="time_filters", action="append", choices=REGISTRY.time_filters,
+                        help="only this time filter, can be given more than once")
+    relevance = parser.add_mutually_exclusive_group()
+    relevance.add_argument("--relevant", dest="relevant", action="store_const", const=True,
+                           help="only COVID related posts")
+    relevance.add_argument("--not-relevant", dest="relevant", action="store_const", const=False,
+                           help="only posts that aren't COVID related")
+    parser.add_argument("--full", action="store_true", help="write every section again instead of reusing the "
+                                                            "sections whose .tsv didn't change")
+    args = parser.parse_args()
+
+    stats = write_report(args.out, args.subreddits, args.time_filters, args.relevant, incremental=not args.full)
+    print("{} sections written ({} entries), {} reused".format(stats["written"], stats["entries"], stats["reused"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Scrapes the top listings of subreddits from Reddit, many listings at a time
+"""
+import csv
+import datetime as dt
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from instrument import stage
+
+
+# Reddit sends a listing 100 posts at a time, so every 100 posts is one request
+PAGE_SIZE = 100
+
+# Columns of the original .tsv files.  id is the Reddit id of the post and fullname is the id with its type, t3_<id>.
+COLUMNS = ['title', 'score', 'num_comm', 'created', 'content', 'id', 'fullname']
+
+# Where incremental scrapes keep track of how far through each listing they got
+CHECKPOINT_DIR = 'data/checkpoints'
+
+
+# changes created UNIX time to standard
+def get_date(created):
+    return dt.datetime.fromtimestamp(created)
+
+
+# Row of the original .tsv files for a single post
+def post_row(post):
+    return [post.title, post.score,
+            post.num_comments, get_date(post.created),
+            post.selftext, post.id, post.name]
+
+
+# Spaces out requests so all threads together stay under Reddit's limit of requests per minute.  When Reddit says
+# to slow down, pause() holds back every thread, not only the one that was told.
+class RateLimiter:
+
+    def __init__(self, requests_per_minute=60):
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    # Waits until this thread is allowed to make a request
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    # Makes every thread wait at least seconds before its next request
+    def pause(self, seconds):
+        with self._lock:
+            self._next_time = max(self._next_time, time.monotonic() + seconds)
+
+
+# Seconds Reddit asked to wait before trying again, if the error came with a Retry-After header
+def _retry_after(error):
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or dict()
+    try:
+        return float(headers.get('retry-after', headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+
+# Calls function until it works, at most retries + 1 times.  Waits longer after every failure, or as long as Reddit
+# asked to wait.
+def with_retries(function, retries=3, backoff=1.0, limiter=None):
+    attempt = 0
+    while True:
+        try:
+            return function()
+        except Exception as error:
+            if attempt >= retries:
+                raise
+            delay = _retry_after(error)
+            if delay is not None and limiter is not None:
+                limiter.pause(delay)
+            if delay is None:
+                delay = backoff * (2 ** attempt) * (1 + random.random() / 2)
+            attempt += 1
+            time.sleep(delay)
+
+
+# Yields the posts of a top listing of a subreddit.  Waits on the limiter before every page of the listing.
+# after is the fullname of a post to start after, used to pick a listing back up.
+def iter_listing(client, subreddit, time_period, limiter=None, limit=1000, after=None):
+    # praw adds its own arguments to params, so it is only passed when there is something in it
+    listing_arguments = {'params': {'after': after}} if after is not None else dict()
+    listing = iter(client.subreddit(subreddit).top(limit=limit, time_filter=time_period, **listing_arguments))
+    count = 0
+    while True:
+        if limiter is not None and count % PAGE_SIZE == 0:
+            limiter.wait()
+        try:
+            post = next(listing)
+        except StopIteration:
+            return
+        count += 1
+        yield post
+
+
+# Gets the rows of a top listing of a subreddit
+def get_listing(client, subreddit, time_period, limiter=None, limit=1000):
+    return [post_row(post) for post in iter_listing(client, subreddit, time_period, limiter, limit)]
+
+
+# Writes the rows of a listing to a .tsv.  The file is written under another name first so a failed scrape never
+# leaves half a file.
+def write_listing(file_location, rows, columns=COLUMNS):
+    temp_location = file_location + '.tmp'
+    with open(temp_location, 'w', encoding='utf-8') as table:
+        writer = csv.writer(table, delimiter='\t')
+        writer.writerow(columns)
+        writer.writerows(rows)
+    os.replace(temp_location, file_location)
+
+
+# Reads a JSON file, or returns default if it doesn't exist
+def _read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+# Reads the rows of an original .tsv by the id of their post.  Files scraped before ids were saved have no ids to
+# match, so they are read as empty and written over.
+def _read_rows_by_id(file_location):
+    rows = dict()
+    try:
+        with open(file_location, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file, delimiter='\t')
+            columns = next(reader, None)
+            if columns != COLUMNS:
+                return rows
+            for row in reader:
+                if len(row) == len(COLUMNS):
+                    rows[row[COLUMNS.index('id')]] = row
+    except OSError:
+        pass
+    return rows
+
+
+# Scrapes a listing into the .tsv it was already scraped into, adding only the posts that aren't in it yet and
+# updating the score and number of comments of the ones that are.  Once the whole listing went through, posts that
+# fell out of a listing of the last day, week or month are removed, while the listing of all time keeps every post it
+# had.  The file and a checkpoint are saved after every page, so an interrupted scrape picks back up after the last
+# saved post.  Returns the number of new, updated and removed posts.
+def scrape_incremental(client, subreddit, time_period, out_dir='data/original', checkpoint_dir=CHECKPOINT_DIR,
+                       limiter=None, limit=1000):
+    file_location = os.path.join(out_dir, subreddit + '_' + time_period + '.tsv')
+    checkpoint_location = os.path.join(checkpoint_dir, subreddit + '_' + time_period + '.json')
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    rows = _read_rows_by_id(file_location)
+    rewrite = len(rows) == 0 or not os.path.exists(file_location)
+
+    # A finished checkpoint means the last scrape got through the whole listing, so this one starts from the top
+    checkpoint = _read_json(checkpoint_location, None)
+    if checkpoint is None or checkpoint.get('complete'):
+        checkpoint = {'after': None, 'count': 0, 'complete': False, 'seen': list()}
+
+    # Ids of the posts seen so far in this pass through the listing.  None for a pass started before they were kept,
+    # which then removes nothing.
+    seen = set(checkpoint['seen']) if 'seen' in checkpoint else None
+
+    score_index, comments_index = COLUMNS.index('score'), COLUMNS.index('num_comm')
+    new_rows = list()
+    new_count, updated_count, removed_count = 0, 0, 0
+
+    def save(after):
+        nonlocal rewrite
+        if rewrite:
+            write_listing(file_location, rows.values())
+            rewrite = False
+        elif len(new_rows) > 0:
+            with open(file_location, 'a', encoding='utf-8') as table:
+                csv.writer(table, delimiter='\t').writerows(new_rows)
+        new_rows.clear()
+        checkpoint['after'] = after
+        if seen is not None:
+            checkpoint['seen'] = sorted(seen)
+        _write_json(checkpoint_location, checkpoint)
+
+    post = None
+    for post in iter_listing(client, subreddit, time_period, limiter, limit - checkpoint['count'],
+                             checkpoint['after']):
+        row = [str(value) for value in post_row(post)]
+        if seen is not None:
+            seen.add(post.id)
+        if post.id not in rows:
+            rows[post.id] = row
+            new_rows.append(row)
+            new_count += 1
+        elif rows[post.id][score_index] != row[score_index] or rows[post.id][comments_index] != row[comments_index]:
+            rows[post.id][score_index] = row[score_index]
+            rows[post.id][comments_index] = row[comments_index]
+            rewrite = True  # A changed row can't be appended, so the whole file is written again
+            updated_count += 1
+
+        checkpoint['count'] += 1
+        if checkpoint['count'] % PAGE_SIZE == 0:
+            save(post.name)
+
+    if time_period != 'all' and seen is not None:
+        for post_id in [post_id for post_id in rows if post_id not in seen]:
+            del rows[post_id]
+            removed_count += 1
+        if removed_count > 0:
+            rewrite = True  # Removed rows can't be taken out of the file, so the whole file is written again
+
+    checkpoint['complete'] = True
+    save(post.name if post is not None else checkpoint['after'])
+    return new_count + updated_count + removed_count
+
+
+# Scrapes every subreddit in every time period at the same time, max_workers listings at a time, and writes each
+# listing to <out_dir>/<subreddit>_<time period>.tsv as soon as it is done.  Every thread gets its own client from
+# client_factory since a praw.Reddit can't be shared between threads.  With incremental=True every listing is
+# scraped with scrape_incremental.  Returns the number of posts written for each listing.
+def scrape_all(subreddits, time_periods, client_factory, out_dir='data/original', max_workers=8,
+               requests_per_minute=60, retries=3, backoff=1.0, limit=1000, incremental=False,
+               checkpoint_dir=CHECKPOINT_DIR):
+    limiter = RateLimiter(requests_per_minute)
+    local = threading.local()
+    os.makedirs(out_dir, exist_ok=True)
+
+    def scrape_listing(subreddit, time_period):
+        if not hasattr(local, 'client'):
+            local.client = client_factory()
+        with stage('scrape', subreddit=subreddit, time_period=time_period, incremental=incremental) as scraping:
+            if incremental:
+                scraping.rows = with_retries(lambda: scrape_incremental(local.client, subreddit, time_period, out_dir,
+                                                                        checkpoint_dir, limiter, limit),
+                                             retries, backoff, limiter)
+            else:
+                rows = with_retries(lambda: get_listing(local.client, subreddit, time_period, limiter, limit),
+                                    retries, backoff, limiter)
+                write_listing(os.path.join(out_dir, subreddit + '_' + time_period + '.tsv'), rows)
+                scraping.rows = len(rows)
+        return scraping.rows
+
+    counts = dict()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(scrape_listing, subreddit, time_period): (subreddit, time_period)
+                   for subreddit in subreddits for time_period in time_periods}
+        for future in as_completed(futures):
+            subreddit, time_period = futures[future]
+            counts[(subreddit, time_period)] = future.result()
+            print('Scraped ' + str(counts[(subreddit, time_period)]) + ' posts from r/' + subreddit + ' (' +
+                  time_period + ')')
+
+    return counts
@@ -0,0 +1,195 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Saves parsed data to a binary snapshot so it only has to be parsed again when the .tsv files change, and
+    finds the data files and snapshot of a table.  Doesn't need plotly, so the scraper can save the snapshots the
+    charts load.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+from columnar import columnar_location
+from registry import load_registry
+from relevance import RelevanceClassifier
+
+# Folder with the original/ and updated/ .tsv files, and the cache/ of parsed snapshots.  REDDIT_DATA_DIR points it
+# somewhere else, ex. at a made up dataset from benchmarks/make_dataset.py.
+DATA_DIR = os.environ.get("REDDIT_DATA_DIR", "data")
+
+# Where snapshots are saved
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# Subreddits and time filters to graph, and the rules of each subreddit
+REGISTRY = load_registry()
+
+# Classifier used by parse_data when no other classifier is given
+COVID_CLASSIFIER = RelevanceClassifier()
+
+# Changing this makes every saved snapshot out of date.  Needed when the layout of the saved data changes.
+SNAPSHOT_VERSION = 6
+
+
+# Gets the data files of a subreddit, one for each of time_filters in the same order.  Every time filter of the
+# registry if time_filters is None.  The columnar file of a time filter is used instead of its updated .tsv when it
+# is at least as new as the .tsv, see columnar.py.  columnar=False always gets the .tsv files.
+
+def data_files(sub_reddit_name, time_filters=None, columnar=True):
+    if time_filters is None:
+        time_filters = REGISTRY.time_filters
+    paths = list()
+    for time_key in time_filters:
+        path = os.path.join(DATA_DIR, "updated", "{name}_{period}.tsv".format(
+            name=sub_reddit_name, period="all" if time_key == "all_time" else time_key))
+        if columnar and _is_newer(columnar_location(path), path):
+            path = columnar_location(path)
+        paths.append(path)
+    return paths
+
+
+# True if path exists and other doesn't, or path was modified at the same time as other or after it
+
+def _is_newer(path, other):
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    try:
+        return modified >= os.stat(other).st_mtime_ns
+    except OSError:
+        return True
+
+
+# Hashes the contents of a file without reading the whole file into memory at once
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Size, modification time and content hash of a source file
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": file_hash(path)}
+
+
+# Checks the saved signatures against the source files.  Returns None if any file changed, otherwise the signatures
+# with updated modification times.  Files are only hashed when their size or modification time changed.
+
+def check_sources(saved_sources, source_paths):
+    if sorted(saved_sources.keys()) != sorted(source_paths):
+        return None
+
+    checked = dict()
+    for path in source_paths:
+        saved = saved_sources[path]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        if stat.st_size != saved["size"]:
+            return None
+        if stat.st_mtime_ns != saved["mtime"] and file_hash(path) != saved["sha256"]:
+            return None
+
+        checked[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": saved["sha256"]}
+
+    return checked
+
+
+# Gets a short file name for a snapshot of data made from a list of things, ex. subreddits and time filters, which
+# can be too long for a file name once joined.  The name is a hash of parts, so the full list should also be in the
+# key to be checked when the snapshot is loaded.  ex. snapshot_name("posts", [["news", "science"], ["day"]])
+
+def snapshot_name(prefix, parts):
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+    return prefix + "_" + digest[:16]
+
+
+# Writes a file by writing to a temporary file first, so an interrupted write never leaves half a file
+
+def _write_atomic(path, data, mode):
+    temp_path = path + ".tmp"
+    with open(temp_path, mode) as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+# Loads the snapshot called name if none of the source files changed since it was saved.  Otherwise calls build()
+# to make the data again and saves it as the new snapshot.
+#   source_paths: the files the data is made from
+#   key: any other settings the data depends on, the snapshot is rebuilt if it is different.  Must be JSON.
+
+def load_snapshot(name, source_paths, build, key=None, cache_dir=CACHE_DIR):
+    manifest_path = os.path.join(cache_dir, name + ".json")
+    data_path = os.path.join(cache_dir, name + ".pickle")
+
+    try:
+        with open(manifest_path, "r", encoding="utf8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = None
+
+    if manifest is not None and manifest.get("version") == SNAPSHOT_VERSION and manifest.get("key") == key:
+        sources = check_sources(manifest["sources"], source_paths)
+        if sources is not None:
+            try:
+                with open(data_path, "rb") as file:
+                    data = pickle.load(file)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                data = None
+
+            if data is not None:
+                # Keeps the new modification times so touched but unchanged files are not hashed next time
+                if sources != manifest["sources"]:
+                    manifest["sources"] = sources
+                    _write_atomic(manifest_path, json.dumps(manifest), "w")
+                return data
+
+    # Signatures are taken before building so a file that changes while it is parsed makes the snapshot out of date
+    sources = {path: file_signature(path) for path in source_paths}
+    data = build()
+    _save(name, sources, data, key, cache_dir)
+    return data
+
+
+# Saves data as the snapshot called name
+
+def save_snapshot(name, source_paths, data, key=None, cache_dir=CACHE_DIR):
+    _save(name, {path: file_signature(path) for path in source_paths}, data, key, cache_dir)
+
+
+def _save(name, sources, data, key, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {"version": SNAPSHOT_VERSION, "key": key, "sources": sources}
+
+    _write_atomic(os.path.join(cache_dir, name + ".pickle"), pickle.dumps(data, pickle.HIGHEST_PROTOCOL), "wb")
+    _write_atomic(os.path.join(cache_dir, name + ".json"), json.dumps(manifest), "w")
+
+
+# Gets the name, key and data files of the snapshot load_data keeps of a table loaded with these settings, for
+# anything else that makes the same table to save it where load_data finds it, ex. run_pipeline
+#   key: the snapshot also depends on how posts were classified.  The file is named from a hash of the subreddits and
+#        time filters, since joining them all makes a name too long for the file system, and the full lists are
+#        checked in the key.
+
+def snapshot_settings(sub_reddit_names, classifier=None, keep_content=True, utc_offset=0, time_filters=None,
+                      columnar=True):
+    if classifier is None:
+        classifier = COVID_CLASSIFIER
+    if time_filters is None:
+        time_filters = REGISTRY.time_filters
+
+    key = {"subreddits": list(sub_reddit_names), "time_filters": list(time_filters), "keep_content": keep_content,
+           "pattern": classifier.pattern.pattern, "flags": classifier.pattern.flags, "utc_offset": utc_offset,
+           "all_relevant": [name for name in sub_reddit_names if REGISTRY.get(name).all_relevant]}
+    name = snapshot_name("posts", [sorted(sub_reddit_names), list(time_filters), keep_content])
+    source_paths = list()
+    for sub_reddit_name in sub_reddit_names:
+        source_paths.extend(data_files(sub_reddit_name, time_filters, columnar))
+    return name, key, source_paths
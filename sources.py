@@ -0,0 +1,206 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Table of the links cited by the posts, normalized once when the posts are loaded, with an index from
+    every website to the posts that cite it and the number of posts and engagement of every website worked out ahead
+"""
+import sys
+from array import array
+from urllib.parse import urlsplit, urlunsplit
+
+
+# Ports that are left out of a link since they are the default of its scheme
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Columns that SourceIndex.top_domains can sort websites by
+DOMAIN_TOTALS = ["posts", "links", "relevant", "score", "num_comm"]
+
+
+# Gets the website a link goes to, ex. "cdc.gov" for "https://www.CDC.gov:443/coronavirus".  The domain is lower case
+# without www. or a port.  Websites are interned since thousands of links go to the same few websites.
+
+def source_domain(source):
+    try:
+        domain = urlsplit(source).hostname or ""
+    except ValueError:  # ex. a broken IPv6 address
+        domain = ""
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return sys.intern(domain)
+
+
+# Writes a link the same way every time it is cited, so the same page is one link in the table.  The scheme and
+# website are lower case, the default port, the #fragment and a trailing / of the path are left out, ex.
+# "HTTPS://www.CDC.gov:443/coronavirus/#cases" is "https://www.cdc.gov/coronavirus".  Links that can't be read are
+# kept as they are.
+
+def normalize_url(source):
+    try:
+        parts = urlsplit(source.strip())
+        host = parts.hostname or ""
+        port = parts.port
+    except ValueError:
+        return source
+    scheme = parts.scheme.lower()
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host += ":" + str(port)
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), parts.query, ""))
+
+
+# Links and websites cited by the posts of a PostTable, built once from the sources column.  Every link and website
+# is stored once and posts refer to them by id.
+#   urls: normalized links, see normalize_url.  url_domains[i] is the website of urls[i].
+#   domains: websites, see source_domain
+#   post_offsets, post_urls: links of row i of the table are post_urls[post_offsets[i]:post_offsets[i + 1]]
+#   domain_rows: rows of the posts that cite every website, in order and each post once.  This is the inverted index
+#       that answers which posts cite a website without going through the sources of every post.
+#   posts, links, relevant, score, num_comm: totals of every website over the posts that cite it, ex. score[i] is the
+#       sum of the scores of the posts citing domains[i].  links counts every citation, posts every post once.
+
+class SourceIndex:
+
+    def __init__(self, post_table):
+        self.urls = list()
+        self.url_domains = array("l")
+        self.domains = list()
+        self.post_offsets = array("l", [0])
+        self.post_urls = array("l")
+        self.domain_rows = list()
+        self.posts = array("q")
+        self.links = array("q")
+        self.relevant = array("q")
+        self.score = array("q")
+        self.num_comm = array("q")
+        self._url_ids = dict()
+        self._domain_ids = dict()
+        # Columns of the table, shared and not copied, for totals over only some posts
+        self._relevant = post_table.relevant
+        self._score = post_table.score
+        self._num_comm = post_table.num_comm
+
+        for row, sources in enumerate(post_table.sources):
+            cited = set()
+            for source in sources:
+                url_id = self._url_id(source)
+                self.post_urls.append(url_id)
+                domain_id = self.url_domains[url_id]
+                self.links[domain_id] += 1
+                if domain_id not in cited:
+                    cited.add(domain_id)
+                    self.domain_rows[domain_id].append(row)
+                    self.posts[domain_id] += 1
+                    self.relevant[domain_id] += post_table.relevant[row] == 1  # -1 is not classified yet
+                    self.score[domain_id] += post_table.score[row]
+                    self.num_comm[domain_id] += post_table.num_comm[row]
+            self.post_offsets.append(len(self.post_urls))
+
+    def __len__(self):
+        return len(self.domains)
+
+    def __contains__(self, domain):
+        return self.domain_id(domain) != -1
+
+    # Gets the id of a website, ex. domain_id("https://www.cdc.gov/") or domain_id("cdc.gov").  -1 if no post cites it.
+    def domain_id(self, domain):
+        if "/" in domain:
+            domain = source_domain(domain)
+        elif domain.lower().startswith("www."):
+            domain = domain[4:]
+        return self._domain_ids.get(domain.lower(), -1)
+
+    # Rows of the posts that cite a website
+    def rows(self, domain):
+        domain_id = self.domain_id(domain)
+        return self.domain_rows[domain_id] if domain_id != -1 else array("l")
+
+    # Normalized links of a row of the table
+    def post_links(self, row):
+        return [self.urls[url_id] for url_id in self.post_urls[self.post_offsets[row]:self.post_offsets[row + 1]]]
+
+    # Websites a row of the table cites, each once
+    def post_domains(self, row):
+        domains = list()
+        for url_id in self.post_urls[self.post_offsets[row]:self.post_offsets[row + 1]]:
+            domain = self.domains[self.url_domains[url_id]]
+            if domain not in domains:
+                domains.append(domain)
+        return domains
+
+    # Posts, links and engagement of the posts that cite a website, ex.
+    #   {"posts": 12, "links": 15, "relevant": 9, "score": 30120, "num_comm": 2210, "mean_score": 2510.0,
+    #    "mean_num_comm": 184.2}
+    # With a mask from PostTable.mask only the selected posts are counted, which goes through the website's posts
+    # instead of using the totals.
+    def engagement(self, domain, mask=None):
+        domain_id = self.domain_id(domain)
+        if domain_id == -1:
+            totals = dict.fromkeys(DOMAIN_TOTALS, 0)
+        elif mask is None:
+            totals = {name: getattr(self, name)[domain_id] for name in DOMAIN_TOTALS}
+        else:
+            totals = self._masked_totals(domain_id, mask)
+        totals["mean_score"] = totals["score"] / totals["posts"] if totals["posts"] > 0 else 0
+        totals["mean_num_comm"] = totals["num_comm"] / totals["posts"] if totals["posts"] > 0 else 0
+        return totals
+
+    # The n websites with the most of a total, as (domain, total) pairs, ex. top_domains(10) for the most cited
+    # websites or top_domains(5, "score") for the websites of the most upvoted posts.  All websites if n is None.
+    # With a mask from PostTable.mask only the selected posts are counted, ex.
+    #   index.top_domains(10, mask=post_table.mask(subreddit="News", relevant=True))
+    def top_domains(self, n=10, by="posts", mask=None):
+        if by not in DOMAIN_TOTALS:
+            raise ValueError("Unknown total " + by + ", expected one of " + ", ".join(DOMAIN_TOTALS))
+        if mask is None:
+            totals = getattr(self, by)
+        else:
+            totals = [self._masked_totals(domain_id, mask)[by] for domain_id in range(len(self.domains))]
+
+        order = sorted((domain_id for domain_id in range(len(self.domains)) if totals[domain_id] > 0),
+                       key=lambda domain_id: (-totals[domain_id], self.domains[domain_id]))
+        if n is not None:
+            order = order[:n]
+        return [(self.domains[domain_id], totals[domain_id]) for domain_id in order]
+
+    # About how many bytes of memory the index takes up
+    def nbytes(self):
+        size = sum(column.itemsize * len(column) for name, column in self.__dict__.items()
+                   if isinstance(column, array) and not name.startswith("_"))
+        size += sum(rows.itemsize * len(rows) for rows in self.domain_rows)
+        size += sum(sys.getsizeof(url) for url in self.urls)
+        return size
+
+    # Totals of a website over only the posts selected by a mask
+    def _masked_totals(self, domain_id, mask):
+        totals = dict.fromkeys(DOMAIN_TOTALS, 0)
+        for row in self.domain_rows[domain_id]:
+            if not mask[row]:
+                continue
+            totals["posts"] += 1
+            totals["links"] += sum(1 for url_id in self.post_urls[self.post_offsets[row]:self.post_offsets[row + 1]]
+                                   if self.url_domains[url_id] == domain_id)
+            totals["relevant"] += self._relevant[row] == 1
+            totals["score"] += self._score[row]
+            totals["num_comm"] += self._num_comm[row]
+        return totals
+
+    # Gets the id of a link, adding it and its website to the table the first time it is cited
+    def _url_id(self, source):
+        url = normalize_url(source)
+        url_id = self._url_ids.get(url)
+        if url_id is not None:
+            return url_id
+
+        domain = source_domain(source)
+        domain_id = self._domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = len(self.domains)
+            self._domain_ids[domain] = domain_id
+            self.domains.append(domain)
+            self.domain_rows.append(array("l"))
+            for column in (self.posts, self.links, self.relevant, self.score, self.num_comm):
+                column.append(0)
+
+        url_id = len(self.urls)
+        self._url_ids[url] = url_id
+        self.urls.append(url)
+        self.url_domains.append(domain_id)
+        return url_id
@@ -0,0 +1,325 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Keeps the enriched posts in a local SQLite database instead of memory.  Posts are ingested once, and the
+    graph functions query the database with GROUP BY, so the data can grow past the memory of the machine and many
+    processes can share one database.
+Run from the top folder of the project, ex.
+    python sqlite_store.py data/reddit.sqlite                      # ingests every subreddit of the registry
+    python graph_data.py --db data/reddit.sqlite daily --subreddit News --output daily.html
+"""
+import argparse
+import sqlite3
+
+from aggregate import METRICS, percentile
+from post_table import TIME_FILTERS
+from sources import source_domain
+
+
+# Tables of the database
+#   posts: one row for every post of a subreddit, with the same columns as a PostTable.  key is what makes a post the
+#          same post within its subreddit, see PostTable.append.
+#   post_time_filters: the time filters every post is in the top posts of, with its score and comments in the listing
+#                      of each one.  A post can be in several listings with different engagement, which posts only
+#                      keeps the first of.
+#   sources: links of every post in the order of the post, with their website
+#   settings: how the posts were loaded, ex. the utc_offset of the calendar columns
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    key NOT NULL,
+    title TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    num_comm INTEGER NOT NULL,
+    created INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    relevant INTEGER NOT NULL,
+    has_sources INTEGER NOT NULL,
+    weekday INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    iso_week INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    UNIQUE (subreddit, key)
+);
+CREATE INDEX IF NOT EXISTS posts_subreddit_created ON posts (subreddit, created);
+CREATE INDEX IF NOT EXISTS posts_subreddit_relevant ON posts (subreddit, relevant, has_sources);
+CREATE INDEX IF NOT EXISTS posts_created ON posts (created);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date);
+CREATE TABLE IF NOT EXISTS post_time_filters (
+    post_id INTEGER NOT NULL REFERENCES posts (id),
+    time_filter TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    num_comm INTEGER NOT NULL,
+    PRIMARY KEY (post_id, time_filter)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS post_time_filters_time_filter ON post_time_filters (time_filter, post_id);
+CREATE TABLE IF NOT EXISTS sources (
+    post_id INTEGER NOT NULL REFERENCES posts (id),
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    PRIMARY KEY (post_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sources_domain ON sources (domain);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value
+);
+"""
+
+# Columns of posts that can be grouped by, averaged or used in conditions
+POST_COLUMNS = ["subreddit", "score", "num_comm", "created", "relevant", "has_sources", "weekday", "month", "hour",
+                "iso_week", "date"]
+
+# Calendar columns of a PostTable that are saved with every post
+_CALENDAR_COLUMNS = ["weekday", "month", "hour", "iso_week", "date"]
+
+
+# Opens the database at path, making its tables if they don't exist.  WAL mode lets other processes read the
+# database while posts are ingested.  A database made before post_time_filters had the engagement of every listing
+# gets the engagement its posts were first added with.
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(SCHEMA)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(post_time_filters)")]
+    if "score" not in columns:
+        with connection:
+            connection.execute("ALTER TABLE post_time_filters ADD COLUMN score INTEGER NOT NULL DEFAULT 0")
+            connection.execute("ALTER TABLE post_time_filters ADD COLUMN num_comm INTEGER NOT NULL DEFAULT 0")
+            connection.execute("UPDATE post_time_filters SET score = (SELECT score FROM posts WHERE id = post_id), "
+                               "num_comm = (SELECT num_comm FROM posts WHERE id = post_id)")
+    return connection
+
+
+# Adds every post of a PostTable to the database in one transaction.  A post that is already in the database keeps
+# the values it was first added with and is only added to the time filters it is in, the same as PostTable.append.
+# The score and comments of the post are also kept for every time filter it is in, so a store of one time filter
+# charts the engagement of that listing.  A PostTable only has the first engagement of a post, so tables should be
+# loaded one time filter at a time, as main does.
+# Every table ingested into a database must have the same utc_offset, since the calendar columns depend on it.
+# Returns the number of new posts.
+
+def ingest(connection, post_table):
+    saved_offset = connection.execute("SELECT value FROM settings WHERE name = 'utc_offset'").fetchone()
+    if saved_offset is not None and saved_offset[0] != post_table.utc_offset:
+        raise ValueError("The database has posts with utc_offset " + str(saved_offset[0]) + ", not " +
+                         str(post_table.utc_offset))
+
+    new_posts = 0
+    keys = post_table.keys()
+    with connection:
+        connection.execute("INSERT OR IGNORE INTO settings (name, value) VALUES ('utc_offset', ?)",
+                           (post_table.utc_offset,))
+        for row in range(len(post_table)):
+            subreddit = post_table.subreddits[post_table.subreddit[row]]
+            cursor = connection.execute(
+                "INSERT INTO posts (subreddit, key, title, score, num_comm, created, content, relevant, has_sources, "
+                "weekday, month, hour, iso_week, date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (subreddit, key) DO NOTHING",
+                [subreddit, keys[row], post_table.titles[row], post_table.score[row], post_table.num_comm[row],
+                 post_table.created[row], post_table.contents[row], post_table.relevant[row],
+                 post_table.has_sources[row]] + [post_table.column(name)[row] for name in _CALENDAR_COLUMNS])
+
+            if cursor.rowcount == 1:
+                post_id = cursor.lastrowid
+                new_posts += 1
+                connection.executemany("INSERT INTO sources (post_id, position, url, domain) VALUES (?, ?, ?, ?)",
+                                       [(post_id, position, source, source_domain(source))
+                                        for position, source in enumerate(post_table.sources[row])])
+            else:
+                post_id = connection.execute("SELECT id FROM posts WHERE subreddit = ? AND key = ?",
+                                             (subreddit, keys[row])).fetchone()[0]
+
+            connection.executemany("INSERT OR IGNORE INTO post_time_filters (post_id, time_filter, score, num_comm) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   [(post_id, time_key, post_table.score[row], post_table.num_comm[row])
+                                    for i, time_key in enumerate(TIME_FILTERS)
+                                    if post_table.time_filters[row] & (1 << i)])
+    return new_posts
+
+
+# The posts of a database, queried with the same methods the graph functions use on a PostTable, ex.
+#   store = SqliteStore(connect("data/reddit.sqlite"))
+#   graph_time_series_engagement_daily("News", store, "score")
+# mask() gives the conditions of a query instead of a list of rows, and count, total, mean and aggregate run it.
+#   time_filters: only uses the posts of these time filters, like load_data.  Every post if None.  The score and
+#                 comments of a post are the ones of the first of these time filters it is in, the same as
+#                 load_data([...], time_filters=time_filters) with the posts of each subreddit.  With None they are
+#                 the ones the post was first ingested with.
+
+class SqliteStore:
+
+    def __init__(self, connection, time_filters=None):
+        self.connection = connection
+        self.time_filters = list(time_filters) if time_filters is not None else None
+        utc_offset = connection.execute("SELECT value FROM settings WHERE name = 'utc_offset'").fetchone()
+        self.utc_offset = utc_offset[0] if utc_offset is not None else 0
+        self._subreddits = None
+
+        # The posts queried, with the engagement of their first time filter of time_filters
+        if self.time_filters is None:
+            self._posts = "posts"
+            self._posts_parameters = list()
+        else:
+            marks = ", ".join("?" * len(self.time_filters))
+            order = " ".join("WHEN ? THEN " + str(i) for i in range(len(self.time_filters)))
+            self._posts = (
+                "(SELECT posts.id AS id, " + ", ".join(
+                    "post_time_filters." + name + " AS " + name if name in ("score", "num_comm") else name
+                    for name in POST_COLUMNS) +
+                " FROM posts JOIN post_time_filters ON post_id = posts.id WHERE time_filter = (SELECT time_filter "
+                "FROM post_time_filters WHERE post_id = posts.id AND time_filter IN (" + marks + ") ORDER BY CASE "
+                "time_filter " + order + " END LIMIT 1)) AS posts")
+            self._posts_parameters = self.time_filters + self.time_filters
+
+    def __len__(self):
+        return self.count(self.mask())
+
+    # Names of the subreddits with posts, in the order they were first ingested.  Queried once, so subreddits
+    # ingested after the store was made are not in it.
+    @property
+    def subreddits(self):
+        if self._subreddits is None:
+            self._subreddits = [row[0] for row in self.connection.execute(
+                "SELECT subreddit FROM posts GROUP BY subreddit ORDER BY MIN(id)")]
+        return self._subreddits
+
+    # Gets the position of a subreddit in subreddits, -1 if it has no posts
+    def subreddit_id(self, sub_reddit_name):
+        subreddits = self.subreddits
+        sub_reddit_name = sub_reddit_name.lower()
+        return subreddits.index(sub_reddit_name) if sub_reddit_name in subreddits else -1
+
+    # Conditions of the posts to query, the same as PostTable.mask, ex. mask(subreddit="News", relevant=True)
+    def mask(self, **conditions):
+        return {name: value for name, value in conditions.items() if value is not None}
+
+    # Number of posts matching a mask
+    def count(self, mask):
+        sql, parameters = self._where(mask)
+        return self.connection.execute("SELECT COUNT(*)" + sql, parameters).fetchone()[0]
+
+    # Sum of a column over the posts matching a mask
+    def total(self, name, mask):
+        sql, parameters = self._where(mask)
+        return self.connection.execute("SELECT TOTAL(" + _column(name) + ")" + sql,
+                                       parameters).fetchone()[0]
+
+    # Mean of a column over the posts matching a mask.  0 if no posts match.
+    def mean(self, name, mask):
+        sql, parameters = self._where(mask)
+        mean = self.connection.execute("SELECT AVG(" + _column(name) + ")" + sql, parameters).fetchone()[0]
+        return mean if mean is not None else 0
+
+    # Groups the posts by key columns and computes metrics of a column for every group with GROUP BY.  Returns the
+    # same {metric: {group: value}} as PostTable.aggregate, ex.
+    #   aggregate(["subreddit", "relevant"], "score", ["mean"]) -> {"mean": {("news", 1): 2051.4, ...}}
+    # median and percentiles are worked out from the values of every group, sorted by the database.
+    def aggregate(self, keys, value=None, metrics=("mean",), **where):
+        for metric in metrics:
+            if metric not in METRICS:
+                raise ValueError("Unknown metric " + metric + ", expected one of " + ", ".join(METRICS))
+        if value is None and any(metric != "count" for metric in metrics):
+            raise ValueError("A value column is needed for metrics other than count")
+
+        group_columns = ", ".join(_column(name) for name in keys)
+        value_column = _column(value) if value is not None else "0"
+        sql, parameters = self._where(self.mask(**where))
+        result = {metric: dict() for metric in metrics}
+
+        rows = self.connection.execute("SELECT " + group_columns + ", COUNT(*), SUM(" + value_column + ")" + sql +
+                                       " GROUP BY " + group_columns, parameters)
+        for row in rows:
+            group, count, total = tuple(row[:len(keys)]), row[len(keys)], row[len(keys) + 1]
+            if "count" in result:
+                result["count"][group] = count
+            if "sum" in result:
+                result["sum"][group] = total
+            if "mean" in result:
+                result["mean"][group] = total / count
+
+        order_metrics = [metric for metric in metrics if metric not in ("count", "sum", "mean")]
+        if len(order_metrics) > 0:
+            group_values = dict()
+            rows = self.connection.execute("SELECT " + group_columns + ", " + value_column + sql +
+                                           " ORDER BY " + group_columns + ", " + value_column, parameters)
+            for row in rows:
+                group_values.setdefault(tuple(row[:len(keys)]), list()).append(row[len(keys)])
+            for metric in order_metrics:
+                percent = 50 if metric == "median" else int(metric[1:])
+                result[metric] = {group: percentile(values, percent) for group, values in group_values.items()}
+
+        return result
+
+    # The n websites cited by the most posts matching the conditions, as (domain, posts) pairs, ex.
+    #   top_domains(10, subreddit="News", relevant=True)
+    def top_domains(self, n=10, **where):
+        sql, parameters = self._where(self.mask(**where))
+        return [tuple(row) for row in self.connection.execute(
+            "SELECT domain, COUNT(DISTINCT post_id) AS posts FROM sources WHERE post_id IN (SELECT id" + sql +
+            ") GROUP BY domain ORDER BY posts DESC, domain LIMIT ?", parameters + [n])]
+
+    # Mean of a column over the posts citing a website that match the conditions, the same as PostTable.domain_mean
+    def domain_mean(self, domain, name, **where):
+        if name not in ("score", "num_comm"):
+            raise ValueError("Unknown column " + name + ", expected one of score, num_comm")
+        sql, parameters = self._where(dict(self.mask(**where), domain=domain))
+        mean = self.connection.execute("SELECT AVG(" + name + ")" + sql, parameters).fetchone()[0]
+        return mean if mean is not None else 0
+
+    # Builds the FROM and WHERE clauses of a mask, from the posts of the time filters of the store.  domain is only
+    # the posts citing a website.
+    def _where(self, mask):
+        clauses = list()
+        parameters = list(self._posts_parameters)
+        for name, value in mask.items():
+            if name == "time_filter":
+                clauses.append("id IN (SELECT post_id FROM post_time_filters WHERE time_filter = ?)")
+            elif name == "domain":
+                clauses.append("id IN (SELECT post_id FROM sources WHERE domain = ?)")
+            else:
+                clauses.append(_column(name) + " = ?")
+                if name == "subreddit":
+                    value = value.lower()
+            parameters.append(int(value) if isinstance(value, bool) else value)
+
+        if len(clauses) == 0:
+            return " FROM " + self._posts, parameters
+        return " FROM " + self._posts + " WHERE " + " AND ".join(clauses), parameters
+
+
+# Checks a column name before it is put in SQL
+def _column(name):
+    if name not in POST_COLUMNS:
+        raise ValueError("Unknown column " + name + ", expected one of " + ", ".join(POST_COLUMNS))
+    return name
+
+
+# Ingests the updated posts of every subreddit and time filter of the registry, one file at a time so only one file
+# of posts is in memory at once
+def main():
+    from graph_data import REGISTRY, load_data
+
+    parser = argparse.ArgumentParser(description="Ingests the updated posts into a SQLite database")
+    parser.add_argument("database", help="SQLite file to ingest into, made if it doesn't exist")
+    parser.add_argument("--subreddit", dest="subreddits", action="append",
+                        help="only ingest this subreddit, can be given more than once")
+    parser.add_argument("--time-filter", dest="time_filters", action="append", choices=REGISTRY.time_filters)
+    parser.add_argument("--utc-offset", type=int, default=0, help="seconds ahead of UTC the .tsv dates are in")
+    args = parser.parse_args()
+
+    connection = connect(args.database)
+    for sub_reddit_name in args.subreddits or REGISTRY.names():
+        name = REGISTRY.get(sub_reddit_name).name
+        for time_key in args.time_filters or REGISTRY.time_filters:
+            post_table = load_data([name], use_cache=False, utc_offset=args.utc_offset, time_filters=[time_key])
+            print("{} {}: {} posts, {} new".format(name, time_key, len(post_table), ingest(connection, post_table)))
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
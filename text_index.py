@@ -0,0 +1,214 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Inverted index of the words in the titles and content of the posts, with the positions of every word, so
+    finding the posts that mention something is a lookup instead of searching the text of every post again.  ex.
+        post_table, index = load_text_index(["news"])
+        rows = index.search('"social distancing" AND (mask OR masks) NOT trump')
+"""
+import os
+import re
+from array import array
+
+from graph_data import load_data
+import snapshot
+from snapshot import REGISTRY, data_files, load_snapshot, snapshot_name
+
+# A word is a run of letters, digits and underscores, ex. "covid-19" is the words "covid" and "19"
+_WORD = re.compile(r"\w+")
+
+# Parts of a search, see TextIndex.search
+_QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_OPERATORS = ["AND", "OR", "NOT"]
+
+# Content positions start this far after the title, so a phrase never runs from the title into the content
+_CONTENT_GAP = 1
+
+
+# Splits text into lower case words
+def tokenize(text):
+    return [word.lower() for word in _WORD.findall(text)]
+
+
+# Words of the titles and content of the rows of a PostTable.
+#   terms: {word: postings}.  The postings of a word are one array of [row, number of positions, positions...] for
+#          every row it is in, in order of row.  Positions count words from the start of the title, and the content
+#          starts _CONTENT_GAP after the last word of the title.
+#   rows: number of rows indexed, row ids are the rows of the table
+
+class TextIndex:
+
+    def __init__(self, post_table):
+        self.rows = len(post_table)
+        self.terms = dict()
+        for row in range(self.rows):
+            words = tokenize(post_table.titles[row])
+            content = tokenize(post_table.contents[row])
+            if len(content) > 0:
+                words.extend([None] * _CONTENT_GAP)
+                words.extend(content)
+
+            positions = dict()
+            for position, word in enumerate(words):
+                if word is not None:
+                    positions.setdefault(word, list()).append(position)
+            for word, word_positions in positions.items():
+                postings = self.terms.get(word)
+                if postings is None:
+                    postings = self.terms[word] = array("l")
+                postings.append(row)
+                postings.append(len(word_positions))
+                postings.extend(word_positions)
+
+    def __len__(self):
+        return len(self.terms)
+
+    # Yields (row, positions) of a word
+    def _postings(self, word):
+        postings = self.terms.get(word)
+        if postings is None:
+            return
+        i = 0
+        while i < len(postings):
+            count = postings[i + 1]
+            yield postings[i], postings[i + 2:i + 2 + count]
+            i += 2 + count
+
+    # Rows that have a word, ex. term("vaccine")
+    def term(self, word):
+        words = tokenize(word)
+        if len(words) != 1:
+            return self.phrase(word)
+        return [row for row, _ in self._postings(words[0])]
+
+    # Rows that have the words of text one after the other, ex. phrase("social distancing")
+    def phrase(self, text):
+        words = tokenize(text)
+        if len(words) == 0:
+            return list()
+        if len(words) == 1:
+            return self.term(words[0])
+
+        # Starts of the phrase in every row that has the first word, kept only while the next words follow them
+        starts = {row: set(positions) for row, positions in self._postings(words[0])}
+        for offset, word in enumerate(words[1:], 1):
+            next_starts = dict()
+            for row, positions in self._postings(word):
+                if row in starts:
+                    matched = {position - offset for position in positions} & starts[row]
+                    if len(matched) > 0:
+                        next_starts[row] = matched
+            starts = next_starts
+            if len(starts) == 0:
+                break
+        return sorted(starts)
+
+    # Words of the index that contain text, ex. containing("covid") is ["covid", "covid19", "postcovid", ...]
+    def containing(self, text):
+        text = text.lower()
+        return [word for word in self.terms if text in word]
+
+    # Rows that match a search of words, "quoted phrases", AND, OR, NOT and parentheses.  Words next to each other
+    # without an operator must all match, ex.
+    #   search("vaccine trial")                  rows with both words
+    #   search('"stay at home" OR lockdown')     rows with the phrase or the word
+    #   search("covid NOT (trump OR biden)")
+    def search(self, query):
+        tokens = list()
+        position = 0
+        while position < len(query):
+            match = _QUERY_TOKEN.match(query, position)
+            if match is None or match.end() == position:
+                break
+            position = match.end()
+            if match.group(1) is not None:
+                tokens.append("(")
+            elif match.group(2) is not None:
+                tokens.append(")")
+            elif match.group(3) is not None:
+                tokens.append(("phrase", match.group(3)))
+            elif match.group(4) in _OPERATORS:
+                tokens.append(match.group(4))
+            else:
+                tokens.append(("phrase", match.group(4)))
+
+        rows, position = self._parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError("Unexpected " + str(tokens[position]) + " in search " + query)
+        return sorted(rows)
+
+    def _parse_or(self, tokens, position):
+        rows, position = self._parse_and(tokens, position)
+        while position < len(tokens) and tokens[position] == "OR":
+            other, position = self._parse_and(tokens, position + 1)
+            rows = rows | other
+        return rows, position
+
+    def _parse_and(self, tokens, position):
+        rows, position = self._parse_not(tokens, position)
+        while position < len(tokens) and tokens[position] not in ("OR", ")"):
+            if tokens[position] == "AND":
+                position += 1
+            other, position = self._parse_not(tokens, position)
+            rows = rows & other
+        return rows, position
+
+    def _parse_not(self, tokens, position):
+        if position < len(tokens) and tokens[position] == "NOT":
+            rows, position = self._parse_not(tokens, position + 1)
+            return set(range(self.rows)) - rows, position
+        if position >= len(tokens):
+            raise ValueError("Search ends where a word or phrase is expected")
+        if tokens[position] == "(":
+            rows, position = self._parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ")":
+                raise ValueError("Search is missing a )")
+            return rows, position + 1
+        if tokens[position] == ")" or tokens[position] in _OPERATORS:
+            raise ValueError("Unexpected " + tokens[position] + " where a word or phrase is expected")
+        return set(self.phrase(tokens[position][1])), position + 1
+
+    # Classifies every row with a RelevanceClassifier the same way parse_data does, as 1 or 0 flags.  Only the rows
+    # that have a word containing the longest run of letters of a keyword are searched, since any match of the
+    # keyword is inside that word.  Keywords without letters search every row.  Rows of subreddits whose posts are
+    # all related are always related.
+    def classify(self, post_table, classifier):
+        candidates = set()
+        for keyword in classifier.keywords:
+            pieces = _WORD.findall(keyword)
+            if len(pieces) == 0:
+                candidates = range(self.rows)
+                break
+            for word in self.containing(max(pieces, key=len)):
+                candidates.update(row for row, _ in self._postings(word))
+
+        relevant = array("b", [0]) * self.rows
+        for sub_id, sub_reddit_name in enumerate(post_table.subreddits):
+            if REGISTRY.get(sub_reddit_name).all_relevant:
+                for row in range(self.rows):
+                    if post_table.subreddit[row] == sub_id:
+                        relevant[row] = 1
+        for row in candidates:
+            if classifier.is_relevant(post_table.titles[row]) or classifier.is_relevant(post_table.contents[row]):
+                relevant[row] = 1
+        return relevant
+
+
+# Loads the posts of the subreddits with load_data and the index of their text.  The index is saved in the cache
+# folder next to the data and only built again when the data files change.  Returns the PostTable, whose rows are the
+# rows of the index, and the TextIndex.  ex. relabelling the posts with other keywords:
+#   post_table, index = load_text_index(["news"])
+#   post_table.set_relevant(index.classify(post_table, RelevanceClassifier(["vaccine", "vaccines"])))
+
+def load_text_index(sub_reddit_names, time_filters=None):
+    post_table = load_data(sub_reddit_names, time_filters=time_filters)
+    source_paths = list()
+    for sub_reddit_name in sub_reddit_names:
+        source_paths.extend(data_files(sub_reddit_name, time_filters))
+
+    time_filters = list(time_filters or REGISTRY.time_filters)
+    name = snapshot_name("text", [sorted(sub_reddit_names), time_filters])
+    key = {"subreddits": list(sub_reddit_names), "time_filters": time_filters, "word": _WORD.pattern,
+           "content_gap": _CONTENT_GAP, "rows": len(post_table)}
+    index = load_snapshot(name, source_paths, lambda: TextIndex(post_table), key,
+                          os.path.join(snapshot.DATA_DIR, "cache"))
+    return post_table, index
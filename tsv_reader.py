@@ -0,0 +1,146 @@
+"""
+authors: Parker, Anthony, Drake, Grace
+description: Streams rows out of the .tsv files without decoding columns until they are used
+"""
+import mmap
+import re
+
+
+# A single field of a row.  Group 1 is the inside of a quoted field, with "" standing for a single ".
+# Group 2 is a field without quotes, which ends at the next tab or line break.
+_FIELD = re.compile(rb'"([^"]*(?:""[^"]*)*)"|([^\t\r\n]*)')
+
+_TAB = ord("\t")
+_CARRIAGE_RETURN = ord("\r")
+_LINE_BREAKS = b"\r\n"
+
+
+# Decodes the bytes of one field the same way csv.reader would read it from a file opened in text mode
+
+def decode_field(raw, quoted):
+    text = raw.decode("utf-8")
+    if quoted:
+        text = text.replace('""', '"')
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+# One row of a .tsv file.  Only the position of each field is kept until the field is asked for.
+#   record["title"]: decoded text of a column, "" if the row doesn't have it
+#   record.raw("content"): bytes of a column without decoding them
+
+class TsvRecord:
+    __slots__ = ("_buffer", "_spans", "_index")
+
+    def __init__(self, buffer, spans, index):
+        self._buffer = buffer
+        self._spans = spans
+        self._index = index
+
+    def _span(self, name):
+        position = self._index[name]
+        if position >= len(self._spans):
+            return None
+        return self._spans[position]
+
+    def raw(self, name):
+        span = self._span(name)
+        if span is None:
+            return b""
+        return self._buffer[span[0]:span[1]]
+
+    def __getitem__(self, name):
+        span = self._span(name)
+        if span is None:
+            return ""
+        return decode_field(self._buffer[span[0]:span[1]], span[2])
+
+    def get(self, name, default=None):
+        if name not in self._index:
+            return default
+        return self[name]
+
+    def __contains__(self, name):
+        return name in self._index
+
+
+# Finds the fields of the row that starts at pos.  Returns the (start, end, quoted) span of every field and the
+# position after the row.
+
+def _read_row(buffer, pos, end):
+    spans = list()
+
+    # Rows without quotes can't have tabs or line breaks inside a field, so the fields are found by only looking
+    # for tabs up to the end of the line
+    line_end = buffer.find(b"\n", pos, end)
+    if line_end == -1:
+        line_end = end
+    if buffer.find(b'"', pos, line_end) == -1:
+        stop = line_end
+        while stop > pos and buffer[stop - 1] == _CARRIAGE_RETURN:
+            stop -= 1
+
+        tab = buffer.find(b"\t", pos, stop)
+        while tab != -1:
+            spans.append((pos, tab, False))
+            pos = tab + 1
+            tab = buffer.find(b"\t", pos, stop)
+        spans.append((pos, stop, False))
+        return spans, line_end
+
+    while True:
+        match = _FIELD.match(buffer, pos)
+        if match.group(1) is not None:
+            spans.append((match.start(1), match.end(1), True))
+        else:
+            spans.append((match.start(2), match.end(2), False))
+        pos = match.end()
+
+        if pos < end and buffer[pos] == _TAB:
+            pos += 1
+        else:
+            return spans, pos
+
+
+# Reads the column names from the first row and yields a TsvRecord for every row after it.  Blank rows are skipped.
+#   columns: names of the columns to keep, every column is kept if None
+#   use_mmap: map the file into memory instead of reading it, so only the parts of the file that are used are loaded
+
+def read_tsv(path, columns=None, use_mmap=True):
+    with open(path, "rb") as file:
+        if use_mmap:
+            try:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files can't be mapped
+                buffer = b""
+        else:
+            buffer = file.read()
+
+    end = len(buffer)
+    pos = 0
+    while pos < end and buffer[pos] in _LINE_BREAKS:
+        pos += 1
+    if pos >= end:
+        return
+
+    header, pos = _read_row(buffer, pos, end)
+    names = [decode_field(buffer[start:stop], quoted) for start, stop, quoted in header]
+    if columns is None:
+        columns = names
+
+    # Records only keep the spans of the chosen columns
+    positions = [names.index(name) for name in columns if name in names]
+    index = {names[position]: i for i, position in enumerate(positions)}
+    for name in columns:
+        if name not in index:
+            index[name] = len(positions)  # Missing columns read as ""
+
+    while pos < end:
+        if buffer[pos] in _LINE_BREAKS:
+            pos += 1
+            continue
+
+        spans, pos = _read_row(buffer, pos, end)
+        yield TsvRecord(buffer, tuple(spans[position] if position < len(spans) else None for position in positions),
+                        index)